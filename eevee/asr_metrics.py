@@ -1,10 +1,16 @@
 import json
+import multiprocessing as mp
+import os
 import re
-from typing import Union, List, Dict
 from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Tuple, Union
 
 from eevee import metrics
 
+# Info tags in references are replaced by spaces
+_INFO_TAG_PATTERN = re.compile(r"<.*?>")
+
 
 def get_metrics(
     ref: str,
@@ -23,7 +29,7 @@ def get_metrics(
     :param hyp: the predicted text (ASR hypothesis)
     :param lang: language code (eg en, hi, ta)
     :param remove_words: Text file path or a list of strings to be removed from the ground truth and hypothesis. Can be used to discount stop words etc
-    :param lexicon: Kaldi lexicon file  path or a {word:lexicon} dict. Will give prediction phone error rate (not the AM per)
+    :param lexicon: Kaldi lexicon file  path, a directory of a saved `LexiconIndex` or a {word:lexicon} dict. Will give prediction phone error rate (not the AM per)
     :param lm: Language model in ARPA format. Check examples for loading example
     :param alignment: Kaldi forced alignment vector
     :param phone_post: Kaldi NNET3/Chain phone posteriors.
@@ -31,44 +37,174 @@ def get_metrics(
     :return: JSON string containing all ASR metrics.
 
     """
-    ref = re.sub("\<.*?\>", " ", ref)
+    context = MetricsContext(
+        lang=lang,
+        remove_words=remove_words,
+        lexicon=lexicon,
+        lm=lm,
+        lemmatize=lemmatize,
+    )
+
+    return context.get_metrics(ref, hyp, alignment=alignment, phone_post=phone_post)
+
+
+def get_metrics_batch(
+    records: Iterable[Tuple],
+    lang: str = None,
+    remove_words: Union[str, List] = None,
+    lexicon: Union[str, Dict] = None,
+    lm=None,
+    lemmatize=False,
+    workers: int = 1,
+) -> List[Dict]:
+    """
+    `get_metrics` over many records, loading the stop words, lexicon and LM
+    once for all of them.
+    :param records: (ref, hyp, alignment, phone_post) tuples, like the
+        arguments of `get_metrics`. alignment and phone_post can be None.
+    :param workers: number of forked processes to score records in
+    :return: List of ASR metrics, one for each record, in order.
+    """
+    context = MetricsContext(
+        lang=lang,
+        remove_words=remove_words,
+        lexicon=lexicon,
+        lm=lm,
+        lemmatize=lemmatize,
+    )
+
+    return list(context.imap(records, workers=workers))
+
+
+class MetricsContext:
+    """
+    Resources shared by many `get_metrics` calls. Stop words and lexicon given
+    as file paths are read and parsed once, when the context is made, and the
+    LM is wrapped in a `PerplexityScorer` whose n-gram memo all calls share.
+    """
 
-    if remove_words and type(remove_words) == str:
-        with open(remove_words) as fin:
-            remove_words = fin.read().split("\n")
+    def __init__(
+        self,
+        lang: str = None,
+        remove_words: Union[str, List] = None,
+        lexicon: Union[str, Dict] = None,
+        lm=None,
+        lemmatize=False,
+    ):
+        """
+        See `get_metrics` for the arguments.
+        """
+        self.lang = lang
+        self.remove_words = _load_remove_words(remove_words)
+        self.lexicon = _load_lexicon(lexicon)
+        self.lm = metrics.get_perplexity_scorer(lm) if lm else lm
+        self.lemmatize = lemmatize
+
+    def get_metrics(
+        self, ref: str, hyp: Union[str, List], alignment=None, phone_post=None
+    ) -> Dict:
+        ref = _INFO_TAG_PATTERN.sub(" ", ref)
+
+        if isinstance(hyp, str):
+            results = _parse_string(
+                ref, hyp, self.lang, self.remove_words, self.lexicon, self.lm, self.lemmatize
+            )
 
-    if lexicon and type(lexicon) == str:
-        with open(lexicon) as fin:
-            lex = fin.read().split("\n")
+        elif isinstance(hyp, list):
+            results = _parse_alters(
+                ref, hyp, self.lang, self.remove_words, self.lexicon, self.lm, self.lemmatize
+            )
 
-        lexicon = {}
-        for word in lex:
-            try:
-                lexicon[word.split(" ", 1)[0]] = word.split(" ", 1)[0]
-            except IndexError:
-                pass
+        try:
+            if alignment and phone_post:
+                results["am_fer"] = _get_am_errors(phone_post, alignment)
+        except KeyError:
+            results["am_fer"] = "NA"
 
-    if type(hyp) == str:
-        results = _parse_string(ref, hyp, lang, remove_words, lexicon, lm, lemmatize)
+        return results
 
-    elif type(hyp) == list:
-        results = _parse_alters(ref, hyp, lang, remove_words, lexicon, lm, lemmatize)
+    def imap(self, records: Iterable[Tuple], workers: int = 1) -> Iterator[Dict]:
+        """
+        Lazily give `get_metrics` results for (ref, hyp, alignment, phone_post)
+        records, in order.
 
-    try:
-        if alignment and phone_post:
-            results["am_fer"] = _get_am_errors(phone_post, alignment)
-    except KeyError:
-        results["am_fer"] = "NA"
+        With `workers` > 1, records are scored in a pool of forked processes
+        that inherit the loaded resources instead of pickling them. Runs with
+        lemmatization stay in this process, since stanza pipelines and lemma
+        caches backed by SQLite don't carry over a fork.
+        """
+        if workers <= 1 or self.lemmatize or "fork" not in mp.get_all_start_methods():
+            for record in records:
+                yield self.get_metrics(*record)
+            return
 
-    return results
+        global _CONTEXT
+        _CONTEXT = self
+        try:
+            with ProcessPoolExecutor(
+                max_workers=workers, mp_context=mp.get_context("fork")
+            ) as executor:
+                yield from executor.map(_get_record_metrics, records, chunksize=64)
+        finally:
+            _CONTEXT = None
+
+
+# Context that forked workers of `MetricsContext.imap` inherit
+_CONTEXT: Optional[MetricsContext] = None
+
+
+def _get_record_metrics(record: Tuple) -> Dict:
+    assert _CONTEXT is not None
+    return _CONTEXT.get_metrics(*record)
+
+
+def _load_remove_words(remove_words: Union[str, List, None]) -> Optional[List]:
+    """
+    Read stop words from a file path, one per line. Lists are returned as is.
+    """
+    if not isinstance(remove_words, str):
+        return remove_words
+
+    if not remove_words:
+        return None
+
+    with open(remove_words) as fin:
+        return fin.read().split("\n")
+
+
+def _load_lexicon(lexicon: Union[str, Dict, None]) -> Optional[Mapping]:
+    """
+    Read a Kaldi lexicon from a file path into a `LexiconIndex`, or memory map
+    one saved in a directory. Dicts are returned as is.
+    """
+    if not isinstance(lexicon, str):
+        return lexicon
+
+    if not lexicon:
+        return None
+
+    if os.path.isdir(lexicon):
+        return metrics.LexiconIndex.load(lexicon)
+
+    with open(lexicon) as fin:
+        lex = fin.read().split("\n")
+
+    words: Dict[str, str] = {}
+    for word in lex:
+        try:
+            words[word.split(" ", 1)[0]] = word.split(" ", 1)[0]
+        except IndexError:
+            pass
+
+    return metrics.LexiconIndex.from_dict(words)
 
 
 def _parse_string(
     ref: str,
     hyp: Union[str, List],
     lang: str = "en",
-    remove_words: List = None,
-    lexicon: Dict = None,
+    remove_words: Optional[List] = None,
+    lexicon: Optional[Mapping] = None,
     lm=None,
     lemmatize=False,
 ) -> Dict:
@@ -89,7 +225,7 @@ def _parse_string(
     results["base"] = metrics.compute_asr_measures(ref, hyp, lexicon=lexicon, lm=lm)
 
     if lm:
-        results["base"]["ref_ppl"] = metrics._get_ppl(ref, lm)
+        results["base"]["ref_ppl"] = metrics.get_perplexity_scorer(lm).perplexity(ref)
 
     if remove_words and lemmatize:
         results["stopwords"] = metrics.compute_asr_measures(
@@ -115,10 +251,10 @@ def _parse_string(
 
 def _parse_alters(
     ref: str,
-    hyp: Union[str, List],
+    hyp: List,
     lang: str,
-    remove_words: List = None,
-    lexicon: Dict = None,
+    remove_words: Optional[List] = None,
+    lexicon: Optional[Mapping] = None,
     lm=None,
     lemmatize=False,
 ) -> Dict:
@@ -135,49 +271,46 @@ def _parse_alters(
     :return: JSON string containing all ASR metrics.
 
     """
-    results = {}
+    results: Dict[str, Any] = {}
     alternatives = []
 
     if ref not in [" ", ""] and len(hyp) == 0:
         hyp.extend([""] * 10)
 
+    if lemmatize and len(hyp) > 0:
+        _prefetch_lemmas(ref, hyp, lang, remove_words)
+
+    alters: List[str]
     if len(hyp) > 0 and type(hyp[0]) == str:
-        for alter in hyp:
-            alternatives.append(
-                {
-                    "hyp": alter,
-                    **_parse_string(
-                        ref=ref,
-                        hyp=alter,
-                        lang=lang,
-                        remove_words=remove_words,
-                        lexicon=lexicon,
-                        lm=lm,
-                        lemmatize=lemmatize,
-                    ),
-                }
-            )
+        alters = hyp
 
     elif len(hyp) > 0 and type(hyp[0]) == list:
-        for alter in hyp[0]:
-            alternatives.append(
-                {
-                    "hyp": alter["transcript"],
-                    **_parse_string(
-                        ref=ref,
-                        hyp=alter["transcript"],
-                        lang=lang,
-                        remove_words=remove_words,
-                        lexicon=lexicon,
-                        lm=lm,
-                        lemmatize=lemmatize,
-                    ),
-                }
+        alters = [alter["transcript"] for alter in hyp[0]]
+
+    else:
+        alters = []
+
+    if alters:
+        alternatives = [
+            {"hyp": alter, **parsed}
+            for alter, parsed in zip(
+                alters,
+                _parse_nbest(
+                    ref=ref,
+                    hyps=alters,
+                    lang=lang,
+                    remove_words=remove_words,
+                    lexicon=lexicon,
+                    lm=lm,
+                    lemmatize=lemmatize,
+                ),
             )
+        ]
+
     results["ref"] = ref
 
     if lm:
-        results["ref_ppl"] = metrics._get_ppl(ref, lm)
+        results["ref_ppl"] = metrics.get_perplexity_scorer(lm).perplexity(ref)
     results["alternatives"] = alternatives
 
     if len(hyp) > 0:
@@ -188,16 +321,90 @@ def _parse_alters(
     return results
 
 
-def _get_top_n(alternatives: Union[Dict, List]) -> Dict:
+def _parse_nbest(
+    ref: str,
+    hyps: List[str],
+    lang: str = "en",
+    remove_words: Optional[List] = None,
+    lexicon: Optional[Mapping] = None,
+    lm=None,
+    lemmatize=False,
+) -> List[Dict]:
+    """
+    `_parse_string` results for each hypothesis in `hyps`. The reference is
+    pre-processed once for each kind of metrics and aligned against all the
+    hypotheses in one call.
+    """
+    results: List[Dict[str, Any]] = [{} for _ in hyps]
+
+    for parsed, base in zip(
+        results, metrics.compute_asr_measures_nbest(ref, hyps, lexicon=lexicon, lm=lm)
+    ):
+        parsed["base"] = base
+
+    if lm:
+        ref_ppl = metrics.get_perplexity_scorer(lm).perplexity(ref)
+        for parsed in results:
+            parsed["base"]["ref_ppl"] = ref_ppl
+
+    unk_removed = [hyp.replace("<UNK>", " ") for hyp in hyps]
+
+    if remove_words and lemmatize:
+        stopwords = metrics.compute_asr_measures_nbest(
+            ref, hyps, words_to_filter=remove_words, lang=lang, lexicon=lexicon
+        )
+        lemmatized = metrics.compute_asr_measures_nbest(
+            ref,
+            unk_removed,
+            words_to_filter=remove_words,
+            lemmatize=True,
+            lang=lang,
+            lexicon=lexicon,
+        )
+        for parsed, stopword, lemma in zip(results, stopwords, lemmatized):
+            parsed["stopwords"] = stopword
+            parsed["lemmatized"] = lemma
+
+    elif lemmatize:
+        lemmatized = metrics.compute_asr_measures_nbest(
+            ref, unk_removed, lemmatize=True, lang=lang, lexicon=lexicon
+        )
+        for parsed, lemma in zip(results, lemmatized):
+            parsed["lemmatized"] = lemma
+
+    return results
+
+
+def _prefetch_lemmas(
+    ref: str, hyp: List, lang: str, remove_words: Optional[List] = None
+) -> None:
+    """
+    Lemmatize the reference and all the alternatives in one batched pass, so
+    that `_parse_string` finds the lemmas already computed.
+    :param ref: ground truth
+    :param hyp: List of the predicted text (ASR hypothesis). kaldi-serve alternatives are valid
+    :param lang: language code (eg en, hi, ta)
+    :param remove_words: List of strings to be removed from the ground truth and hypothesis
+    """
+    if type(hyp[0]) == list:
+        hyp = [alter["transcript"] for alter in hyp[0]]
+
+    sentences = [ref] + [alter.replace("<UNK>", " ") for alter in hyp]
+
+    metrics.asr.prefetch_lemmas(sentences, lang, words_to_filter=remove_words)
+
+
+def _get_top_n(alternatives: Union[Dict, List], ns: Iterable[int] = (3, 5, 7, 10)) -> Dict:
     """
     Get an average of the first n alternatives
     :param alternatives: List of ASR metric results
+    :param ns: Numbers of leading alternatives to average. The first 10 are reported as "avg"
     :return: Dictionary with first n averages
     """
 
-    top = {n: metrics.aggregate_metrics(alternatives[:n]) for n in [3, 5, 7, 10]}
+    top = metrics.aggregate_top_n(alternatives, ns)
 
-    return {"first_3": top[3], "first_5": top[5], "first_7": top[7], "avg": top[10]}
+    return {("avg" if n == 10 else f"first_{n}"): top[n] for n in ns}
 
 
 def _get_delta(alternatives: Union[Dict, List], lang: str) -> Dict:
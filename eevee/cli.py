@@ -4,7 +4,8 @@ eevee
 Usage:
   eevee intent <true-labels> <pred-labels> [--json] [--alias-yaml=<alias_yaml_path>] [--groups-yaml=<groups-yaml_path>] [--breakdown]
   eevee intent layers <true-labels> <pred-labels> --layers-yaml=<layers_yaml_path> [--breakdown] [--json]
-  eevee asr <true-labels> <pred-labels> [--json] [--dump] [--noisy]
+  eevee asr <true-labels> <pred-labels> [--json] [--dump] [--noisy] [--workers=<workers>] [--memo-size=<memo_size>] [--min-k=<min_k>] [--ops-top-k=<ops_top_k>]
+  eevee asr <true-labels> <pred-labels> --stream [--chunk-size=<chunk_size>] [--json] [--workers=<workers>] [--memo-size=<memo_size>] [--min-k=<min_k>] [--ops-top-k=<ops_top_k>]
   eevee entity <true-labels> <pred-labels> [--json] [--breakdown] [--dump]
 
 Options:
@@ -20,6 +21,22 @@ Options:
                                         * splits the dataset into noisy and non-noisy subsets
                                           and returns results for both separately
                                         * expects uncleaned asr alternatives, with informational tags
+  --workers=<workers>               Number of processes to score ASR utterances with
+                                    [default: 1].
+  --memo-size=<memo_size>           Number of aligned (truth, prediction) pairs to keep
+                                    and reuse for repeated pairs. The hit rate is added
+                                    to the report when non zero [default: 0].
+  --min-k=<min_k>                   Comma separated numbers, from 1 to 10, of leading ASR
+                                    alternatives to report the best WER within
+                                    [default: 3,10].
+  --ops-top-k=<ops_top_k>           If given along with --dump, the ops csv only has this
+                                    many of the most frequent errors, counted approximately
+                                    in bounded memory with an error bound on each count.
+                                    Also writes the ops csv when streaming.
+  --stream                          If true, reads predicted labels in chunks and keeps
+                                    only running sums of the ASR metrics in memory.
+  --chunk-size=<chunk_size>         Number of predicted labels read per chunk when
+                                    streaming [default: 100000].
   --alias-yaml=<alias_yaml_path>    Path to aliasing yaml for intents.
   --groups-yaml=<groups_yaml_path>  Path to intent groups yaml for batched evaluation.
   --layers-yaml=<layers_yaml_path>  Path to intent layers yaml for evaluation of sub layers.
@@ -39,7 +56,8 @@ from docopt import docopt
 from eevee import __version__
 from eevee.metrics import intent_report
 from eevee.metrics.classification import intent_layers_report
-from eevee.metrics.asr import asr_report, process_noise_info
+from eevee.metrics.asr import (annotate_noise_info, asr_report,
+                               asr_report_slices, asr_report_streaming)
 from eevee.metrics.entity import categorical_entity_report, entity_report
 from eevee.utils import parse_yaml
 
@@ -128,6 +146,29 @@ def main():
             else:
                 print(output)
 
+    elif args["asr"] and args["--stream"]:
+        ops_top_k = int(args["--ops-top-k"]) if args["--ops-top-k"] else None
+        output = asr_report_streaming(
+            args["<true-labels>"],
+            args["<pred-labels>"],
+            chunksize=int(args["--chunk-size"]),
+            workers=int(args["--workers"]),
+            memo_size=int(args["--memo-size"]),
+            min_k=[int(k) for k in args["--min-k"].split(",")],
+            ops_top_k=ops_top_k,
+        )
+
+        if ops_top_k is not None:
+            output, ops = output
+            ops.to_csv(
+                f'{args["<pred-labels>"].replace(".csv", "")}-ops.csv', index=False
+            )
+
+        if args["--json"]:
+            print(output.to_json(indent=2))
+        else:
+            print(output)
+
     elif args["asr"]:
         true_labels = pd.read_csv(
             args["<true-labels>"], usecols=["id", "transcription"]
@@ -135,18 +176,35 @@ def main():
         pred_labels = pd.read_csv(args["<pred-labels>"], usecols=["id", "utterances"])
 
         dump = True if args["--dump"] else False
+        workers = int(args["--workers"])
+        memo_size = int(args["--memo-size"])
+        min_k = [int(k) for k in args["--min-k"].split(",")]
+        ops_top_k = int(args["--ops-top-k"]) if args["--ops-top-k"] else None
+
+        if ops_top_k is not None and not dump:
+            raise ValueError("--ops-top-k requires, --dump along with it.")
 
         if args["--noisy"]:
 
-            noisy_dict, not_noisy_dict = process_noise_info(true_labels, pred_labels)
-            input_dict = {"noisy": noisy_dict, "not-noisy": not_noisy_dict}
-            output_dict = {}
+            # Utterances are scored once and reported on per subset
+            true_labels = annotate_noise_info(true_labels)
+            true_labels["subset"] = true_labels["noise-label"].map(
+                {1: "noisy", 0: "not-noisy"}
+            )
+            output_dict = asr_report_slices(
+                true_labels[["id", "transcription", "subset"]],
+                pred_labels,
+                "subset",
+                slices=["noisy", "not-noisy"],
+                dump=dump,
+                workers=workers,
+                memo_size=memo_size,
+                min_k=min_k,
+                ops_top_k=ops_top_k,
+            )
 
             if dump:
-                for key, subset in input_dict.items():
-                    output, breakdown, ops = asr_report(
-                        subset["true"], subset["pred"], dump
-                    )
+                for key, (output, breakdown, ops) in output_dict.items():
                     output_dict[key] = output
                     breakdown.to_csv(
                         f'{key}-{args["<pred-labels>"].replace(".csv", "")}-dump.csv',
@@ -156,10 +214,6 @@ def main():
                         f'{key}-{args["<pred-labels>"].replace(".csv", "")}-ops.csv',
                         index=False,
                     )
-            else:
-                for key, subset in input_dict.items():
-                    output = asr_report(subset["true"], subset["pred"])
-                    output_dict[key] = output
 
             if args["--json"]:
                 for key, output in output_dict.items():
@@ -172,7 +226,15 @@ def main():
 
         else:
             if dump:
-                output, breakdown, ops = asr_report(true_labels, pred_labels, dump)
+                output, breakdown, ops = asr_report(
+                    true_labels,
+                    pred_labels,
+                    dump,
+                    workers=workers,
+                    memo_size=memo_size,
+                    min_k=min_k,
+                    ops_top_k=ops_top_k,
+                )
                 breakdown.to_csv(
                     f'{args["<pred-labels>"].replace(".csv", "")}-dump.csv', index=False
                 )
@@ -180,7 +242,13 @@ def main():
                     f'{args["<pred-labels>"].replace(".csv", "")}-ops.csv', index=False
                 )
             else:
-                output = asr_report(true_labels, pred_labels)
+                output = asr_report(
+                    true_labels,
+                    pred_labels,
+                    workers=workers,
+                    memo_size=memo_size,
+                    min_k=min_k,
+                )
 
             if args["--json"]:
                 print(output.to_json(indent=2))
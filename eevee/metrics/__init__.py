@@ -1,5 +1,11 @@
-from eevee.metrics.asr import (aggregate_metrics, compute_asr_measures, mer,
-                               wer, wil)
+from eevee.metrics.asr import (Alignment, Vocabulary, aggregate_metrics,
+                               aggregate_top_n, metric_arrays,
+                               compute_asr_measures,
+                               compute_asr_measures_batch,
+                               compute_asr_measures_nbest, mer, wer, wil)
+from eevee.metrics.lexicon import LexiconIndex
+from eevee.metrics.lm import (NgramLM, PerplexityScorer, get_perplexity_scorer,
+                              load_arpa)
 from eevee.metrics.classification import intent_report, intent_layers_report
 from eevee.metrics.entity import entity_report
 from eevee.metrics.slot_filling import (slot_capture_rate, slot_fnr, slot_fpr,
@@ -1,16 +1,23 @@
 import re
 import itertools
 import json
-from collections import Counter
-from functools import reduce
+import sys
+from array import array
+from collections import Counter, OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from functools import cached_property, reduce
 from operator import mul
-from typing import Any, Dict, List, Mapping, Tuple, Union
+from typing import (Any, Collection, Dict, Iterable, List, Mapping, Optional,
+                    Tuple, Union)
 
 import eevee.transforms as tr
 import Levenshtein
 import numpy as np
 import pandas as pd
-from eevee.metrics.utils import fpr_fnr
+from eevee.metrics.lexicon import LexiconIndex
+from eevee.metrics.lm import get_perplexity_scorer
+from eevee.metrics.utils import SpaceSaving, fpr_fnr
 
 _default_transform = tr.Compose(
     [
@@ -20,7 +27,7 @@ _default_transform = tr.Compose(
         tr.SentencesToListOfWords(),
         tr.RemoveEmptyStrings(),
     ]
-)
+).compile()
 
 _standardize_transform = tr.Compose(
     [
@@ -29,13 +36,367 @@ _standardize_transform = tr.Compose(
         tr.RemoveKaldiNonWords(),
         tr.RemoveWhiteSpace(replace_by_space=True),
     ]
-)
+).compile()
 
 AlternativeMetric = Dict[str, Any]
 
+# Variant to its metric names and an (alternatives x metrics) array of values
+MetricArrays = Dict[str, Tuple[List[str], np.ndarray]]
+
+# Alignment intermediates each measure needs. Intermediates are cached on the
+# `Alignment` so the ones shared by several measures are computed once.
+_MEASURE_DEPENDENCIES: Dict[str, Tuple[str, ...]] = {
+    "wer": ("distance",),
+    "cer": ("char_counts",),
+    "mer": ("counts",),
+    "wil": ("counts",),
+    "wip": ("counts",),
+    "hper": ("per",),
+    "rper": ("per",),
+    "phone_error": (),
+    "ppl": (),
+    "oov_rate": (),
+    "unk_rate": (),
+    "hits": ("counts",),
+    "substitutions": ("counts",),
+    "deletions": ("counts",),
+    "insertions": ("counts",),
+    "char_hits": ("char_counts",),
+    "char_substitutions": ("char_counts",),
+    "char_deletions": ("char_counts",),
+    "char_insertions": ("char_counts",),
+}
+
+ASR_MEASURES = tuple(_MEASURE_DEPENDENCIES)
+
+# Measures computed when no selection is given, all but the character counts
+_DEFAULT_MEASURES = tuple(name for name in ASR_MEASURES if not name.startswith("char_"))
+
+# Alternatives kept per utterance in reports
+_MAX_ALTERNATIVES = 10
+
+# Utterances with fewer truth words than this are short
+_SHORT_UTTERANCE_LEN = 3
+
+# Info tags of annotated transcriptions. Only the first tag is extracted, while
+# the removal pattern also drops punctuation and `~`.
+_INFO_TAG_PATTERN = re.compile(
+    r"(<.*?>|<[a-z]+|[a-z]+>|[a-z]+_[a-z]+|[a-z]+_|_[a-z]+)"
+)
+_INFO_TAG_REMOVAL_PATTERN = re.compile(
+    r"(<.*?>)|[`.,:;\[\]]]+|(<[a-z]+)|([a-z]+>)|([a-z]+_[a-z]+)|([a-z]+_)|(_[a-z]+)|~"
+)
+
+# Per utterance counts that corpus level measures are summed from
+COUNT_COLUMNS = (
+    "hits",
+    "substitutions",
+    "deletions",
+    "insertions",
+    "char_hits",
+    "char_substitutions",
+    "char_deletions",
+    "char_insertions",
+)
+
+# Measures that need a lexicon or an LM, not available in batch mode
+_RESOURCE_MEASURES = ("phone_error", "ppl", "oov_rate")
+
+
+class Vocabulary:
+    """
+    Growable word to integer id table.
+
+    A single vocabulary can be shared across all the `_preprocess` calls of a
+    report run, so the word ids stay stable over the whole corpus and can be
+    used for later error analysis. Words are encoded as `chr(id)` strings for
+    Levenshtein. When ids run past the unicode code point range, the pair is
+    remapped to pair local ids instead.
+    """
+
+    def __init__(self, words: Iterable[str] = ()):
+        self.word2id: Dict[str, int] = {}
+        self.id2word: List[str] = []
+        self.update(words)
+
+    def __len__(self) -> int:
+        return len(self.id2word)
+
+    def __contains__(self, word: str) -> bool:
+        return word in self.word2id
+
+    def add(self, word: str) -> int:
+        """
+        Return id of `word`, adding it to the vocabulary if not present.
+        """
+        try:
+            return self.word2id[word]
+        except KeyError:
+            idx = len(self.id2word)
+            self.word2id[word] = idx
+            self.id2word.append(word)
+            return idx
+
+    def update(self, words: Iterable[str]):
+        for word in words:
+            self.add(word)
+
+    def encode(self, words: Iterable[str]) -> List[int]:
+        return [self.add(word) for word in words]
+
+    def decode(self, ids: Iterable[int]) -> List[str]:
+        return [self.id2word[idx] for idx in ids]
+
+    @classmethod
+    def from_corpus(
+        cls,
+        sentences: Iterable[str],
+        transform: Union[tr.Compose, tr.AbstractTransform] = _default_transform,
+    ) -> "Vocabulary":
+        """
+        Seed a vocabulary from a corpus, usually the truth transcriptions,
+        using the same `transform` that is used for scoring.
+        """
+        vocabulary = cls()
+        for words in _transform_series(pd.Series(list(sentences), dtype=object), transform):
+            vocabulary.update(w for w in words if w not in ["", " "])
+
+        return vocabulary
+
+    def save(self, path: str):
+        with open(path, "w") as fp:
+            json.dump(self.id2word, fp, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, path: str) -> "Vocabulary":
+        with open(path) as fp:
+            return cls(json.load(fp))
+
+
+class Alignment:
+    """
+    Alignment between a pre-processed truth and hypothesis pair.
+
+    The word and character level alignments are each computed at most once,
+    on first use, and all the measures derived from them are cached. The
+    operation counts are collected in a single pass over the edit operations.
+    """
+
+    def __init__(
+        self,
+        truth: str,
+        hypothesis: str,
+        truth_raw: List[str],
+        hypothesis_raw: List[str],
+    ):
+        """
+        :param truth: the truth words encoded as a string, one character per word
+        :param hypothesis: the hypothesis words encoded like `truth`
+        :param truth_raw: the transformed truth words
+        :param hypothesis_raw: the transformed hypothesis words
+        """
+        self.truth = truth
+        self.hypothesis = hypothesis
+        self.truth_raw = truth_raw
+        self.hypothesis_raw = hypothesis_raw
+
+    @classmethod
+    def from_pair(
+        cls,
+        truth: str,
+        hypothesis: str,
+        truth_transform: Union[tr.Compose, tr.AbstractTransform] = _default_transform,
+        hypothesis_transform: Union[tr.Compose, tr.AbstractTransform] = _default_transform,
+        vocabulary: Vocabulary = None,
+    ) -> "Alignment":
+        return cls(
+            *_preprocess(
+                truth, hypothesis, truth_transform, hypothesis_transform, vocabulary
+            )
+        )
+
+    @cached_property
+    def editops(self) -> List[Tuple[str, int, int]]:
+        return Levenshtein.editops(self.truth, self.hypothesis)
+
+    @cached_property
+    def counts(self) -> Tuple[int, int, int, int]:
+        """
+        Word level #hits, #substitutions, #deletions, #insertions
+        """
+        return _count_editops(self.editops, len(self.truth))
+
+    @cached_property
+    def distance(self) -> int:
+        """
+        Word level edit distance. Taken from the operation counts if those are
+        already computed, otherwise found without building the edit operations.
+        """
+        if "counts" in self.__dict__:
+            _, S, D, I = self.counts
+            return S + D + I
+
+        return Levenshtein.distance(self.truth, self.hypothesis)
+
+    @property
+    def hits(self) -> int:
+        return self.counts[0]
+
+    @property
+    def substitutions(self) -> int:
+        return self.counts[1]
+
+    @property
+    def deletions(self) -> int:
+        return self.counts[2]
+
+    @property
+    def insertions(self) -> int:
+        return self.counts[3]
+
+    @cached_property
+    def char_counts(self) -> Tuple[int, int, int, int]:
+        """
+        Character level #hits, #substitutions, #deletions, #insertions
+        """
+        return _get_char_operation_counts(self.truth_raw, self.hypothesis_raw)
+
+    @cached_property
+    def wer(self) -> float:
+        # H + S + D is the truth length
+        return float(self.distance) / max(1, float(len(self.truth)))
+
+    @cached_property
+    def mer(self) -> float:
+        H, S, D, I = self.counts
+        return float(S + D + I) / max(1, float(H + S + D + I))
+
+    @cached_property
+    def wip(self) -> float:
+        H = self.counts[0]
+        return (
+            (float(H) / max(1, len(self.truth)))
+            * (float(H) / max(1, len(self.hypothesis)))
+            if self.hypothesis
+            else 0
+        )
+
+    @cached_property
+    def wil(self) -> float:
+        return 1 - self.wip
+
+    @cached_property
+    def cer(self) -> float:
+        H, S, D, I = self.char_counts
+        return float(S + D + I) / max(1, float(H + S + D))
+
+    @cached_property
+    def per(self) -> Tuple[float, float]:
+        return _get_per(self.truth_raw, self.hypothesis_raw)
+
+    @property
+    def char_hits(self) -> int:
+        return self.char_counts[0]
+
+    @property
+    def char_substitutions(self) -> int:
+        return self.char_counts[1]
+
+    @property
+    def char_deletions(self) -> int:
+        return self.char_counts[2]
+
+    @property
+    def char_insertions(self) -> int:
+        return self.char_counts[3]
+
+    @property
+    def hper(self) -> float:
+        return self.per[0]
+
+    @property
+    def rper(self) -> float:
+        return self.per[1]
+
+
+class AlignmentMemo:
+    """
+    LRU memo of `Alignment`s keyed by the transformed (truth, hypothesis)
+    words. A repeated pair is aligned once and later lookups reuse the
+    alignment, along with the measures already cached on it.
+    """
+
+    def __init__(self, max_size: int = 100000):
+        """
+        :param max_size: maximum number of alignments kept
+        """
+        self.max_size = max_size
+        self.memory: "OrderedDict[Tuple[Tuple[str, ...], Tuple[str, ...]], Alignment]" = (
+            OrderedDict()
+        )
+        self.hits = 0
+        self.misses = 0
+
+    def align(
+        self, truth: List[str], hypothesis: List[str], vocabulary: Vocabulary = None
+    ) -> Alignment:
+        key = (tuple(truth), tuple(hypothesis))
+        try:
+            alignment = self.memory[key]
+            self.memory.move_to_end(key)
+            self.hits += 1
+            return alignment
+        except KeyError:
+            pass
+
+        self.misses += 1
+        alignment = Alignment(*_encode_words(truth, hypothesis, vocabulary))
+        if self.max_size > 0:
+            self.memory[key] = alignment
+            if len(self.memory) > self.max_size:
+                self.memory.popitem(last=False)
+
+        return alignment
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "size": len(self.memory),
+        }
+
+
+def metric_arrays(alternative_metrics: List[AlternativeMetric]) -> MetricArrays:
+    """
+    Turn alternative metric dictionaries, like the ones `aggregate_metrics`
+    takes, into an (alternatives x metrics) array per variant.
+    """
+    # Assuming first alternative has all the keys that are involved.
+    # Skipping these items. They don't make sense from aggregation standpoint.
+    variant_blacklist = {"hyp"}
+
+    arrays = {}
+    for variant, metric_dict in alternative_metrics[0].items():
+        if variant in variant_blacklist:
+            continue
+
+        names = list(metric_dict.keys())
+        arrays[variant] = (
+            names,
+            np.array(
+                [[am[variant][name] for name in names] for am in alternative_metrics],
+                dtype=np.float64,
+            ).reshape(len(alternative_metrics), len(names)),
+        )
+
+    return arrays
+
 
 def aggregate_metrics(
-    alternative_metrics: List[AlternativeMetric], aggregation_fn=np.mean
+    alternative_metrics: Union[List[AlternativeMetric], MetricArrays],
+    aggregation_fn=np.mean,
 ) -> AlternativeMetric:
     """
     Aggregate metric dictionaries from multiple alternatives using
@@ -48,23 +409,50 @@ def aggregate_metrics(
       "stopword": {...},
       "hypothesis": <str>
     }
+
+    The alternatives can also be given in the array form of `metric_arrays`.
     """
-    # Assuming first alternative has all the keys that are involved.
-    variants = alternative_metrics[0].keys()
-    # print(variants)
-    # Skipping these items. They don't make sense from aggregation standpoint.
-    variant_blacklist = {"hyp"}
+    if not isinstance(alternative_metrics, dict):
+        alternative_metrics = metric_arrays(alternative_metrics)
 
     output = {}
-    for variant in variants:
-        if variant in variant_blacklist:
-            continue
+    for variant, (names, values) in alternative_metrics.items():
+        if aggregation_fn is np.mean:
+            aggregated = values.mean(axis=0)
+        else:
+            aggregated = [aggregation_fn(values[:, idx]) for idx in range(len(names))]
 
-        metric_dicts = [am[variant] for am in alternative_metrics]
-        output[variant] = {
-            name: aggregation_fn([m[name] for m in metric_dicts])
-            for name in metric_dicts[0].keys()
-        }
+        output[variant] = dict(zip(names, aggregated))
+
+    return output
+
+
+def aggregate_top_n(
+    alternative_metrics: Union[List[AlternativeMetric], MetricArrays],
+    ns: Iterable[int],
+) -> Dict[int, AlternativeMetric]:
+    """
+    Mean metrics over the first n alternatives, for each n in `ns`, from a
+    single cumulative sum over the alternatives. With fewer than n
+    alternatives, the mean is over all of them.
+    """
+    if not isinstance(alternative_metrics, dict):
+        alternative_metrics = metric_arrays(alternative_metrics)
+
+    cumulative = {
+        variant: (names, np.cumsum(values, axis=0))
+        for variant, (names, values) in alternative_metrics.items()
+    }
+
+    output: Dict[int, AlternativeMetric] = {}
+    for n in ns:
+        if n < 1:
+            raise ValueError(f"can't aggregate over the first {n} alternatives")
+
+        output[n] = {}
+        for variant, (names, sums) in cumulative.items():
+            count = min(n, len(sums))
+            output[n][variant] = dict(zip(names, sums[count - 1] / count))
 
     return output
 
@@ -83,7 +471,12 @@ def wer(
     :return: WER as a floating point number
     """
     measures = compute_asr_measures(
-        truth, hypothesis, truth_transform, hypothesis_transform, **kwargs
+        truth,
+        hypothesis,
+        truth_transform,
+        hypothesis_transform,
+        metrics=("wer",),
+        **kwargs,
     )
     return measures["wer"]
 
@@ -102,7 +495,12 @@ def mer(
     :return: MER as a floating point number
     """
     measures = compute_asr_measures(
-        truth, hypothesis, truth_transform, hypothesis_transform, **kwargs
+        truth,
+        hypothesis,
+        truth_transform,
+        hypothesis_transform,
+        metrics=("mer",),
+        **kwargs,
     )
     return measures["mer"]
 
@@ -121,7 +519,12 @@ def wip(
     :return: WIP as a floating point number
     """
     measures = compute_asr_measures(
-        truth, hypothesis, truth_transform, hypothesis_transform, **kwargs
+        truth,
+        hypothesis,
+        truth_transform,
+        hypothesis_transform,
+        metrics=("wip",),
+        **kwargs,
     )
     return measures["wip"]
 
@@ -139,7 +542,12 @@ def wil(
     :return: WIL as a floating point number
     """
     measures = compute_asr_measures(
-        truth, hypothesis, truth_transform, hypothesis_transform, **kwargs
+        truth,
+        hypothesis,
+        truth_transform,
+        hypothesis_transform,
+        metrics=("wil",),
+        **kwargs,
     )
     return measures["wil"]
 
@@ -149,6 +557,7 @@ def compute_asr_measures(
     hypothesis: str,
     truth_transform: Union[tr.Compose, tr.AbstractTransform] = _default_transform,
     hypothesis_transform: Union[tr.Compose, tr.AbstractTransform] = _default_transform,
+    metrics: Optional[Collection[str]] = None,
     **kwargs,
 ) -> Mapping[str, float]:
     """
@@ -165,144 +574,427 @@ def compute_asr_measures(
     :param hypothesis: the hypothesis sentence as a string
     :param truth_transform: the transformation to apply on the truths input
     :param hypothesis_transform: the transformation to apply on the hypothesis input
+    :param metrics: names of the measures to compute, from `ASR_MEASURES`. All
+        measures but the character counts are computed if not given.
     :return: a dict with WER, MER, WIP and WIL measures as floating point numbers
     """
+    return compute_asr_measures_nbest(
+        truth,
+        [hypothesis],
+        truth_transform,
+        hypothesis_transform,
+        metrics=metrics,
+        **kwargs,
+    )[0]
+
+
+def compute_asr_measures_nbest(
+    truth: str,
+    hypotheses: List[str],
+    truth_transform: Union[tr.Compose, tr.AbstractTransform] = _default_transform,
+    hypothesis_transform: Union[tr.Compose, tr.AbstractTransform] = _default_transform,
+    metrics: Optional[Collection[str]] = None,
+    **kwargs,
+) -> List[Mapping[str, float]]:
+    """
+    Calculate error measures between a ground-truth sentence and each of a
+    list of hypotheses, like the n-best alternatives of an ASR.
+
+    The truth is pre-processed and encoded once, and every hypothesis is
+    aligned against it. Each result is the same as what `compute_asr_measures`
+    gives for that (truth, hypothesis) pair, with the same arguments.
+    :param truth: the ground-truth sentence as a string
+    :param hypotheses: the hypothesis sentences
+    :param truth_transform: the transformation to apply on the truths input
+    :param hypothesis_transform: the transformation to apply on the hypothesis input
+    :param metrics: names of the measures to compute, from `ASR_MEASURES`. All
+        measures but the character counts are computed if not given.
+    :return: a dict of measures for each hypothesis, in order
+    """
+    metrics = _select_measures(metrics)
+    hypotheses = list(hypotheses)
 
     # deal with old API
+    for t in _legacy_transforms(kwargs):
+        truth = t(truth)
+        hypotheses = [t(hypothesis) for hypothesis in hypotheses]
+
+    # Preprocess truth and hypotheses
+    alignments = _align_nbest(
+        _transform_sentence(truth, truth_transform),
+        [
+            _transform_sentence(hypothesis, hypothesis_transform)
+            for hypothesis in hypotheses
+        ],
+        kwargs.get("vocabulary"),
+    )
+
+    return [_alignment_measures(alignment, metrics, **kwargs) for alignment in alignments]
+
+
+def _legacy_transforms(kwargs: Dict[str, Any]) -> List[Any]:
+    """
+    Sentence level transforms asked for through the keyword arguments of
+    `compute_asr_measures`.
+    """
+    transforms = []
+
     if "standardize" in kwargs:
-        truth = _standardize_transform(truth)
-        hypothesis = _standardize_transform(hypothesis)
+        transforms.append(_standardize_transform)
 
     if "words_to_filter" in kwargs:
-        t = tr.Compose(
-            [tr.ToLowerCase(), tr.RemoveSpecificWords(kwargs["words_to_filter"])]
-        )
-        truth = t(truth)
-        hypothesis = t(hypothesis)
+        transforms.append(_filter_words_transform(kwargs["words_to_filter"]))
 
     if "lemmatize" in kwargs:
-        t = tr.Compose([tr.ToLowerCase(), tr.Lemmatize(lang=kwargs["lang"])])
-        truth = t(truth)
-        hypothesis = t(hypothesis)
+        transforms.append(
+            tr.Compose([tr.ToLowerCase(), tr.get_lemmatizer(kwargs["lang"])])
+        )
 
-    # Preprocess truth and hypothesis
-    truth, hypothesis, truth_raw, hypothesis_raw = _preprocess(
-        truth, hypothesis, truth_transform, hypothesis_transform
-    )
+    return transforms
 
-    # Get the operation counts (#hits, #substitutions, #deletions, #insertions)
-    H, S, D, I, _ = _get_operation_counts(truth, hypothesis)
 
-    # Compute Word Error Rate
-    wer = float(S + D + I) / max(1, float(H + S + D))
+def _alignment_measures(
+    alignment: "Alignment", metrics: Collection[str], **kwargs
+) -> Dict[str, float]:
+    truth_raw, hypothesis_raw = alignment.truth_raw, alignment.hypothesis_raw
+    _prepare_alignment(alignment, metrics)
 
-    # Compute Match Error Rate
-    mer = float(S + D + I) / max(1, float(H + S + D + I))
+    results = {}
+    for name in metrics:
+        if _MEASURE_DEPENDENCIES[name]:
+            results[name] = getattr(alignment, name)
 
-    # Compute Word Information Preserved
-    wip = (
-        (float(H) / max(1, len(truth))) * (float(H) / max(1, len(hypothesis)))
-        if hypothesis
-        else 0
-    )
+    lexicon = kwargs.get("lexicon")
+    if "phone_error" in metrics:
+        results["phone_error"] = (
+            _get_phn_error(truth_raw, hypothesis_raw, lexicon) if lexicon is not None else 0
+        )
 
-    # Compute Word Information Lost
-    wil = 1 - wip
+    if "oov_rate" in metrics:
+        oov = 0
+        if isinstance(lexicon, LexiconIndex):
+            oov = lexicon.count_oov(truth_raw)
+        elif lexicon is not None:
+            oov = sum(word not in lexicon for word in truth_raw)
 
-    # Get hPER and rPER
-    hper, rper = _get_per(truth_raw, hypothesis_raw)
+        results["oov_rate"] = oov / len(truth_raw)
 
-    # Get CER
-    cer = _get_cer(truth_raw, hypothesis_raw)
+    if "ppl" in metrics:
+        lm = kwargs.get("lm")
+        results["ppl"] = _get_ppl(hypothesis_raw, lm) if lm is not None else 0
 
-    oov = 0
-    if "lexicon" in kwargs and kwargs["lexicon"] is not None:
-        phn_error = _get_phn_error(truth_raw, hypothesis_raw, kwargs["lexicon"])
+    if "unk_rate" in metrics:
+        results["unk_rate"] = hypothesis_raw.count("<unk>") / len(truth_raw)
 
-        for word in truth_raw:
-            try:
-                kwargs["lexicon"][word]
-            except KeyError:
-                oov += 1
+    return {name: results[name] for name in metrics}
 
-    else:
-        phn_error = 0
 
-    if "lm" in kwargs and kwargs["lm"] is not None:
-        ppl = _get_ppl(hypothesis_raw, kwargs["lm"])
-    else:
-        ppl = 0
+def prefetch_lemmas(
+    sentences: List[str], lang: str, words_to_filter: List[str] = None
+) -> List[str]:
+    """
+    Lemmatize sentences in one batched stanza pass, ahead of calls to
+    `compute_asr_measures` with `lemmatize=True` (and `words_to_filter`
+    if given) on the same sentences. Those calls then reuse the lemmas.
+    :return: the lemmatized sentences
+    """
+    if words_to_filter:
+        sentences = [_filter_words_transform(words_to_filter)(s) for s in sentences]
 
-    oov_rate = oov / len(truth_raw)
+    return tr.get_lemmatizer(lang).process_batch([s.lower() for s in sentences])
 
-    unk_rate = hypothesis_raw.count("<unk>") / len(truth_raw)
 
-    return {
-        "wer": wer,
-        "cer": cer,
-        "mer": mer,
-        "wil": wil,
-        "wip": wip,
-        "hper": hper,
-        "rper": rper,
-        "phone_error": phn_error,
-        "ppl": ppl,
-        "oov_rate": oov_rate,
-        "unk_rate": unk_rate,
-        "hits": H,
-        "substitutions": S,
-        "deletions": D,
-        "insertions": I,
+def _filter_words_transform(words_to_filter: List[str]) -> tr.Compose:
+    return tr.Compose([tr.ToLowerCase(), tr.RemoveSpecificWords(words_to_filter)])
+
+
+def _select_measures(
+    metrics: Optional[Collection[str]], available: Collection[str] = ASR_MEASURES
+) -> List[str]:
+    """
+    Validate a selection of measure names and put them in the canonical order.
+    """
+    if metrics is None:
+        return [name for name in _DEFAULT_MEASURES if name in available]
+
+    unknown = set(metrics) - set(available)
+    if unknown:
+        raise ValueError(
+            f"unknown measures {sorted(unknown)}, expected some of {list(available)}"
+        )
+
+    return [name for name in available if name in metrics]
+
+
+def _prepare_alignment(alignment: "Alignment", metrics: Collection[str]):
+    """
+    Compute the alignment intermediates needed for `metrics`, making sure
+    the edit distance is taken from the operation counts when both are needed.
+    """
+    required = {dep for name in metrics for dep in _MEASURE_DEPENDENCIES[name]}
+
+    if "counts" in required:
+        alignment.counts
+
+
+def compute_asr_measures_batch(
+    truths: Iterable[str],
+    hypotheses: Iterable[str],
+    truth_transform: Union[tr.Compose, tr.AbstractTransform] = _default_transform,
+    hypothesis_transform: Union[tr.Compose, tr.AbstractTransform] = _default_transform,
+    vocabulary: Vocabulary = None,
+    metrics: Optional[Collection[str]] = None,
+    memo: AlignmentMemo = None,
+) -> Dict[str, np.ndarray]:
+    """
+    Calculate error measures for many (truth, hypothesis) pairs in one call.
+
+    Each pair is pre-processed and aligned like in `compute_asr_measures`, but
+    only the raw operation counts are collected per pair. All the rates are
+    then derived from the count arrays with vectorized numpy operations, so the
+    values are exactly the ones `compute_asr_measures` gives for the same pair.
+    Lexicon and LM dependent measures are not part of the batch output.
+    :param truths: the ground-truth sentences
+    :param hypotheses: the hypothesis sentences, aligned with `truths`
+    :param truth_transform: the transformation to apply on the truths input
+    :param hypothesis_transform: the transformation to apply on the hypothesis input
+    :param vocabulary: word ids shared across all the pairs, a new one is used if not given
+    :param metrics: names of the measures to compute. The default measures not
+        depending on a lexicon or an LM are computed if not given.
+    :param memo: memo to look up alignments of repeated pairs in. Every pair is
+        aligned on its own if not given.
+    :return: a dict of measure name to a numpy array with one value per pair
+    """
+    truths = list(truths)
+    hypotheses = list(hypotheses)
+    vocabulary = Vocabulary() if vocabulary is None else vocabulary
+    metrics = _select_measures(
+        metrics,
+        available=[name for name in ASR_MEASURES if name not in _RESOURCE_MEASURES],
+    )
+    required = {dep for name in metrics for dep in _MEASURE_DEPENDENCIES[name]}
+
+    if len(truths) != len(hypotheses):
+        raise ValueError(
+            f"got {len(truths)} truths but {len(hypotheses)} hypotheses, expected equal lengths"
+        )
+
+    n_pairs = len(truths)
+    # Columns are hits, substitutions, deletions and insertions
+    word_counts = np.zeros((n_pairs, 4), dtype=np.int64)
+    char_counts = np.zeros((n_pairs, 4), dtype=np.int64)
+    distances = np.zeros(n_pairs, dtype=np.int64)
+    truth_lengths = np.zeros(n_pairs, dtype=np.int64)
+    hypothesis_lengths = np.zeros(n_pairs, dtype=np.int64)
+    unk_counts = np.zeros(n_pairs, dtype=np.int64)
+    raw_truth_lengths = np.zeros(n_pairs, dtype=np.int64)
+    hper = np.zeros(n_pairs, dtype=np.float64)
+    rper = np.zeros(n_pairs, dtype=np.float64)
+
+    # Transforms run over whole columns before the pairs are aligned
+    truth_words = _transform_series(pd.Series(truths, dtype=object), truth_transform)
+    hypothesis_words = _transform_series(
+        pd.Series(hypotheses, dtype=object), hypothesis_transform
+    )
+
+    for idx, (truth, hypothesis) in enumerate(zip(truth_words, hypothesis_words)):
+        if memo is None:
+            alignment = Alignment(*_encode_words(truth, hypothesis, vocabulary))
+        else:
+            alignment = memo.align(truth, hypothesis, vocabulary)
+        truth_lengths[idx] = len(alignment.truth)
+        hypothesis_lengths[idx] = len(alignment.hypothesis)
+        raw_truth_lengths[idx] = len(alignment.truth_raw)
+
+        if "counts" in required:
+            word_counts[idx] = alignment.counts
+        elif "distance" in required:
+            distances[idx] = alignment.distance
+
+        if "char_counts" in required:
+            char_counts[idx] = alignment.char_counts
+
+        if "per" in required:
+            hper[idx], rper[idx] = alignment.per
+
+        if "unk_rate" in metrics:
+            unk_counts[idx] = alignment.hypothesis_raw.count("<unk>")
+
+    H, S, D, I = word_counts.T
+    if "counts" in required:
+        distances = S + D + I
+
+    wip = np.zeros(n_pairs, dtype=np.float64)
+    has_hypothesis = hypothesis_lengths > 0
+    wip[has_hypothesis] = (
+        H[has_hypothesis] / np.maximum(1, truth_lengths[has_hypothesis])
+    ) * (H[has_hypothesis] / np.maximum(1, hypothesis_lengths[has_hypothesis]))
+
+    cH, cS, cD, cI = char_counts.T
+
+    # Rates are derived lazily so only the selected ones are computed
+    columns = {
+        "wer": lambda: distances / np.maximum(1, truth_lengths),
+        "cer": lambda: (cS + cD + cI) / np.maximum(1, cH + cS + cD),
+        "mer": lambda: distances / np.maximum(1, H + S + D + I),
+        "wil": lambda: 1 - wip,
+        "wip": lambda: wip,
+        "hper": lambda: hper,
+        "rper": lambda: rper,
+        "unk_rate": lambda: unk_counts / raw_truth_lengths,
+        "hits": lambda: H,
+        "substitutions": lambda: S,
+        "deletions": lambda: D,
+        "insertions": lambda: I,
+        "char_hits": lambda: cH,
+        "char_substitutions": lambda: cS,
+        "char_deletions": lambda: cD,
+        "char_insertions": lambda: cI,
     }
 
+    return {name: columns[name]() for name in metrics}
+
 
 def _preprocess(
     truth: str,
     hypothesis: str,
     truth_transform: Union[tr.Compose, tr.AbstractTransform],
     hypothesis_transform: Union[tr.Compose, tr.AbstractTransform],
-) -> Tuple[str, str]:
+    vocabulary: Vocabulary = None,
+) -> Tuple[str, str, List[str], List[str]]:
     """
     Pre-process the truth and hypothesis into a form that Levenshtein can handle.
     :param truth: the ground-truth sentence as a string
     :param hypothesis: the hypothesis sentence as a string
     :param truth_transform: the transformation to apply on the truths input
     :param hypothesis_transform: the transformation to apply on the hypothesis input
+    :param vocabulary: word ids to reuse, a pair local one is built if not given
     :return: the preprocessed truth and hypothesis
     """
 
     # Apply transforms. By default, it collapses input to a list of words
-    if truth.strip() not in [" ", ""]:
-        truth = truth_transform(truth)
-    else:
-        truth = [""]
+    truth_words = _transform_sentence(truth, truth_transform)
+    hypothesis_words = _transform_sentence(hypothesis, hypothesis_transform)
 
-    if hypothesis.strip() not in [" ", ""]:
-        hypothesis = hypothesis_transform(hypothesis)
-    else:
-        hypothesis = [""]
+    return _encode_words(truth_words, hypothesis_words, vocabulary)
+
+
+def _transform_sentence(
+    sentence: str, transform: Union[tr.Compose, tr.AbstractTransform]
+) -> List[str]:
+    if sentence.strip() not in [" ", ""]:
+        return transform(sentence)
+
+    return [""]
+
+
+def _transform_series(
+    sentences: pd.Series, transform: Union[tr.Compose, tr.AbstractTransform]
+) -> List[List[str]]:
+    """
+    Vectorized counterpart of the transform step in `_preprocess`. Blank
+    sentences become `[""]` like they do there.
+    """
+    sentences = sentences.astype(object)
+    blank = (sentences.str.strip() == "").to_numpy()
+
+    words: List[List[str]] = [[""] for _ in range(len(sentences))]
+    if not blank.all():
+        transformed = transform(sentences[~blank])
+        for idx, sentence_words in zip(np.flatnonzero(~blank), transformed):
+            words[idx] = sentence_words
 
+    return words
+
+
+def _encode_words(
+    truth: List[str], hypothesis: List[str], vocabulary: Vocabulary = None
+) -> Tuple[str, str, List[str], List[str]]:
+    """
+    Encode transformed truth and hypothesis words for Levenshtein.
+    :param truth: the transformed truth words
+    :param hypothesis: the transformed hypothesis words
+    :param vocabulary: word ids to reuse, a pair local one is built if not given
+    :return: the encoded truth and hypothesis, followed by their words
+    """
     # raise an error if the ground truth is empty
     # doesn't raise an error anymore due to the check in line 271. This is because we want to know the errors in silent segments
     if len(truth) == 0:
         raise ValueError("the ground truth cannot be an empty")
 
     # tokenize each word into an integer
-    vocabulary = set(truth + hypothesis)
-    word2char = dict(zip(vocabulary, range(len(vocabulary))))
+    if vocabulary is None:
+        vocabulary = Vocabulary()
 
-    truth_chars = [chr(word2char[w]) for w in truth if w not in ["", " "]]
-    hypothesis_chars = [chr(word2char[w]) for w in hypothesis if w not in ["", " "]]
+    truth_ids = vocabulary.encode(w for w in truth if w not in ["", " "])
+    hypothesis_ids = vocabulary.encode(w for w in hypothesis if w not in ["", " "])
 
-    truth_str = "".join(truth_chars)
-    hypothesis_str = "".join(hypothesis_chars)
+    truth_str, hypothesis_str = _ids_to_strings(truth_ids, hypothesis_ids)
 
     return truth_str, hypothesis_str, truth, hypothesis
 
 
+def _align_nbest(
+    truth: List[str],
+    hypotheses: List[List[str]],
+    vocabulary: Vocabulary = None,
+    memo: "AlignmentMemo" = None,
+) -> List["Alignment"]:
+    """
+    Align transformed hypotheses against the same transformed truth. The
+    truth is transformed and encoded once and shared by all the alignments.
+    Each alignment is still a separate `Levenshtein.editops` call over the
+    word ids.
+    :param truth: the transformed truth words
+    :param hypotheses: the transformed words of each hypothesis
+    :param vocabulary: word ids to reuse, a new one is used if not given
+    :param memo: memo to look up alignments of repeated pairs in
+    """
+    if memo is not None:
+        return [memo.align(truth, hypothesis, vocabulary) for hypothesis in hypotheses]
+
+    if len(truth) == 0:
+        raise ValueError("the ground truth cannot be an empty")
+
+    if vocabulary is None:
+        vocabulary = Vocabulary()
+
+    truth_ids = vocabulary.encode(w for w in truth if w not in ["", " "])
+    truth_str = (
+        "".join(map(chr, truth_ids))
+        if max(truth_ids, default=0) <= sys.maxunicode
+        else None
+    )
+
+    alignments = []
+    for hypothesis in hypotheses:
+        hypothesis_ids = vocabulary.encode(w for w in hypothesis if w not in ["", " "])
+        if truth_str is not None and max(hypothesis_ids, default=0) <= sys.maxunicode:
+            encoded = truth_str, "".join(map(chr, hypothesis_ids))
+        else:
+            encoded = _ids_to_strings(truth_ids, hypothesis_ids)
+
+        alignments.append(Alignment(*encoded, truth, hypothesis))
+
+    return alignments
+
+
+def _ids_to_strings(truth_ids: List[int], hypothesis_ids: List[int]) -> Tuple[str, str]:
+    """
+    Encode word ids as strings with one character per word. Ids that don't fit
+    in the unicode code point range are remapped to ids local to the pair.
+    """
+    if max(truth_ids + hypothesis_ids, default=0) > sys.maxunicode:
+        local_ids: Dict[int, int] = {}
+        truth_ids = [local_ids.setdefault(i, len(local_ids)) for i in truth_ids]
+        hypothesis_ids = [local_ids.setdefault(i, len(local_ids)) for i in hypothesis_ids]
+
+    return "".join(map(chr, truth_ids)), "".join(map(chr, hypothesis_ids))
+
+
 def _get_operation_counts(
     source_string: str, destination_string: str
-) -> Tuple[int, int, int, int]:
+) -> Tuple[int, int, int, int, List[Tuple[str, int, int]]]:
     """
     Check how many edit operations (delete, insert, replace) are required to
     transform the source string into the destination string. The number of hits
@@ -310,24 +1002,42 @@ def _get_operation_counts(
     total length of the source string.
     :param source_string: the source string to transform into the destination string
     :param destination_string: the destination to transform the source string into
-    :return: a tuple of #hits, #substitutions, #deletions, #insertions
+    :return: a tuple of #hits, #substitutions, #deletions, #insertions and the
+        edit operations
     """
 
     editops = Levenshtein.editops(source_string, destination_string)
 
-    substitutions = sum(1 if op[0] == "replace" else 0 for op in editops)
-    deletions = sum(1 if op[0] == "delete" else 0 for op in editops)
-    insertions = sum(1 if op[0] == "insert" else 0 for op in editops)
-    hits = len(source_string) - (substitutions + deletions)
+    hits, substitutions, deletions, insertions = _count_editops(
+        editops, len(source_string)
+    )
 
     return hits, substitutions, deletions, insertions, editops
 
 
-def _get_per(truth: str, hypothesis: str) -> Tuple[float, float]:
+def _count_editops(editops: List, source_length: int) -> Tuple[int, int, int, int]:
+    """
+    Count #hits, #substitutions, #deletions, #insertions in a single pass over
+    Levenshtein edit operations.
+    :param editops: edit operations as given by `Levenshtein.editops`
+    :param source_length: length of the source sequence of the edit operations
+    :return: a tuple of #hits, #substitutions, #deletions, #insertions
+    """
+    counts = Counter(op[0] for op in editops)
+
+    S = counts["replace"]
+    D = counts["delete"]
+    I = counts["insert"]
+    H = source_length - (S + D)
+
+    return H, S, D, I
+
+
+def _get_per(truth: List[str], hypothesis: List[str]) -> Tuple[float, float]:
     """
     Calculates hPer and rPer
-    :param truth: the ground truth
-    :param hypothesis: the ASR hypothesis string
+    :param truth: the ground truth words
+    :param hypothesis: the ASR hypothesis words
     :return: a tuple of #hper and #rper
     """
     r_count = Counter(truth)
@@ -344,51 +1054,56 @@ def _get_per(truth: str, hypothesis: str) -> Tuple[float, float]:
     return h_per, r_per
 
 
-def _get_cer(truth: str, hypothesis: str) -> float:
+def _get_cer(truth: List[str], hypothesis: List[str]) -> float:
     """
     Calculates Character Error Rate.
-    :param truth: the ground truth
-    :param hypothesis: ASR hypothesis
+    :param truth: the ground truth words
+    :param hypothesis: ASR hypothesis words
     :return: CER (float)
     """
-    truth = " ".join(truth)
-    hypothesis = " ".join(hypothesis)
-
-    editops = Levenshtein.editops(truth, hypothesis)
-
-    S = sum(1 if op[0] == "replace" else 0 for op in editops)
-    D = sum(1 if op[0] == "delete" else 0 for op in editops)
-    I = sum(1 if op[0] == "insert" else 0 for op in editops)
-    H = len(truth) - (S + D)
+    H, S, D, I = _get_char_operation_counts(truth, hypothesis)
 
     cer = float(S + D + I) / max(1, float(H + S + D))
 
     return cer
 
 
-def _get_phn_error(truth: str, hypothesis: str, lexicon: Dict) -> float:
+def _get_char_operation_counts(
+    truth: List[str], hypothesis: List[str]
+) -> Tuple[int, int, int, int]:
     """
-    Calculates Phone Error Rate between ground truth and ASR hypothesis. Ths is not the AM phone error rate
-    :param truth: the ground truth
-    :param hypothesis: ASR hypothesis
-    :param lexicon: The ASR lexicon dictionary
-    :return: Phone Error Rate (float)
+    Character level operation counts between space joined words.
+    :param truth: the ground truth words
+    :param hypothesis: ASR hypothesis words
+    :return: a tuple of #hits, #substitutions, #deletions, #insertions
     """
-    truth = " ".join([lexicon[x] for x in truth if x in lexicon])
-    hypothesis = " ".join([lexicon[x] for x in hypothesis if x in lexicon])
+    truth_chars = " ".join(truth)
+    hypothesis_chars = " ".join(hypothesis)
 
-    vocabulary = set(truth + hypothesis)
-    word2char = dict(zip(vocabulary, range(len(vocabulary))))
+    return _count_editops(
+        Levenshtein.editops(truth_chars, hypothesis_chars), len(truth_chars)
+    )
 
-    truth = "".join([chr(word2char[w]) for w in truth])
-    hypothesis = "".join([chr(word2char[w]) for w in hypothesis])
 
-    editops = Levenshtein.editops(truth, hypothesis)
+def _get_phn_error(truth: List[str], hypothesis: List[str], lexicon: Mapping) -> float:
+    """
+    Calculates Phone Error Rate between ground truth and ASR hypothesis. Ths is not the AM phone error rate
+    :param truth: the ground truth words
+    :param hypothesis: ASR hypothesis words
+    :param lexicon: The ASR lexicon dictionary or `LexiconIndex`
+    :return: Phone Error Rate (float)
+    """
+    # Pronunciations are compared character by character, as strings
+    if isinstance(lexicon, LexiconIndex):
+        truth_phones = lexicon.phones(truth).tobytes().decode("utf-32-le")
+        hypothesis_phones = lexicon.phones(hypothesis).tobytes().decode("utf-32-le")
+    else:
+        truth_phones = " ".join([lexicon[x] for x in truth if x in lexicon])
+        hypothesis_phones = " ".join([lexicon[x] for x in hypothesis if x in lexicon])
 
-    S = sum(1 if op[0] == "replace" else 0 for op in editops)
-    D = sum(1 if op[0] == "delete" else 0 for op in editops)
-    I = sum(1 if op[0] == "insert" else 0 for op in editops)
-    H = len(truth) - (S + D)
+    H, S, D, I = _count_editops(
+        Levenshtein.editops(truth_phones, hypothesis_phones), len(truth_phones)
+    )
 
     phn_er = float(S + D + I) / max(float(H + S + D), 1)
 
@@ -406,69 +1121,238 @@ def _get_am_errors(align: List, phone_post: List) -> float:
     align_phones = "".join([chr(int(p)) for p in align])
     post_phones = "".join([chr(int(p)) for p in phone_post])
 
-    H, S, D, I = _get_operation_counts(align_phones, post_phones)
+    H, S, D, I, _ = _get_operation_counts(align_phones, post_phones)
 
     # Compute frame error rate
     fer = float(S + D + I) / max(float(H + S + D), 1)
     return fer
 
 
-def _get_ppl(sent: str, lm) -> float:
+def _get_ppl(sent: Union[str, List[str]], lm) -> float:
     """
     Calculates perplexity of a sentence based on n-gram lm
-    :param sent: Sentence for which perplexity needs to be calculated
-    :param lm: N-Gram LM
+    :param sent: Sentence, or its words, for which perplexity needs to be calculated
+    :param lm: N-Gram LM, or its `PerplexityScorer`
     :return: Perplexity of sentence
     """
-    sent = sent.split()
-
-    sent = [x for x in sent if x in lm.vocabulary()]
-    sentence = " ".join(sent)
-    # Perplexity = 1 / (P(sent)**(1/len(sent)))
-    if len(sent) > 1:
-        return (1 / lm.s(sentence)) ** (1 / len(sent))
-    else:
-        try:
-            return (1 / lm.p(sentence)) ** (1 / len(sent))
-        except KeyError:
-            try:
-                return (1 / lm.p("<UNK>")) ** (1 / len(sent))
-            except KeyError:
-                return lm.counts()[0][1]
+    return get_perplexity_scorer(lm).perplexity(sent)
 
 
-def get_ops(truths: List[str], preds: List[str]) -> pd.DataFrame:
-    ops = []
-    ops_list = []
+def get_ops(
+    truths: List[str], preds: List[str], vocabulary: Vocabulary = None
+) -> pd.DataFrame:
+    ops = _EditOpsCounter(Vocabulary() if vocabulary is None else vocabulary)
     for truth, pred in zip(truths, preds):
-        truth_rep, pred_rep, truth, pred = _preprocess(
-            truth, pred, _default_transform, _default_transform
+        ops.add_alignment(
+            Alignment.from_pair(
+                truth, pred, _default_transform, _default_transform, ops.vocabulary
+            )
         )
-        _, _, _, _, editops = _get_operation_counts(truth_rep, pred_rep)
 
-        for op in editops:
+    return ops.rows()
+
+
+class _EditOpsCounter:
+    """
+    Mergeable counts of word level edit operations.
+
+    Each operation is packed in a single int64 key of its truth and predicted
+    word ids, with -1 for the missing word of an insertion or a deletion. Keys
+    are buffered in a compact array and counted with `np.unique` a chunk at a
+    time, so memory grows with the number of distinct operations rather than
+    with the number of operations. The position each operation first occurs at
+    is kept, so rows come out in the same order as counting tuples in a
+    `Counter` would give.
+    """
+
+    columns = ["operation", "truth", "pred", "count"]
+
+    def __init__(self, vocabulary: Vocabulary, chunk_size: int = 1 << 20):
+        self.vocabulary = vocabulary
+        self.chunk_size = chunk_size
+        self.keys = np.zeros(0, dtype=np.int64)
+        self.first = np.zeros(0, dtype=np.int64)
+        self.counts = np.zeros(0, dtype=np.int64)
+        # Number of operations counted so far, including the pending ones
+        self.seen = 0
+        self._pending = array("q")
+
+    def add_alignment(self, alignment: Alignment):
+        truth, pred = alignment.truth_raw, alignment.hypothesis_raw
+        add = self.vocabulary.add
+
+        for op in alignment.editops:
             if op[0] == "insert":
-                ops_list.append(("insertion", "***", pred[op[2]]))
+                key = add(pred[op[2]]) + 1
             elif op[0] == "delete":
-                ops_list.append(("deletion", truth[op[1]], "***"))
+                key = (add(truth[op[1]]) + 1) << 32
             else:
-                ops_list.append(("substitution", truth[op[1]], pred[op[2]]))
-    op_counts = Counter(ops_list)
-    for op in op_counts:
-        ops.append(
-            {"operation": op[0], "truth": op[1], "pred": op[2], "count": op_counts[op]}
+                key = ((add(truth[op[1]]) + 1) << 32) | (add(pred[op[2]]) + 1)
+            self._pending.append(key)
+            self.seen += 1
+
+        if len(self._pending) >= self.chunk_size:
+            self._flush()
+
+    def _flush(self):
+        if not self._pending:
+            return
+
+        keys, first, counts = np.unique(
+            np.frombuffer(self._pending, dtype=np.int64),
+            return_index=True,
+            return_counts=True,
+        )
+        offset = self.seen - len(self._pending)
+        self._pending = array("q")
+        self._combine(keys, first + offset, counts)
+
+    def _combine(self, keys: np.ndarray, first: np.ndarray, counts: np.ndarray):
+        keys, inverse = np.unique(
+            np.concatenate([self.keys, keys]), return_inverse=True
+        )
+        merged_first = np.full(len(keys), np.iinfo(np.int64).max, dtype=np.int64)
+        np.minimum.at(merged_first, inverse, np.concatenate([self.first, first]))
+        merged_counts = np.zeros(len(keys), dtype=np.int64)
+        np.add.at(merged_counts, inverse, np.concatenate([self.counts, counts]))
+
+        self.keys, self.first, self.counts = keys, merged_first, merged_counts
+
+    def empty(self) -> "_EditOpsCounter":
+        """
+        A new counter with the same settings and its own vocabulary.
+        """
+        return _EditOpsCounter(Vocabulary(), self.chunk_size)
+
+    def merge(self, other: "_EditOpsCounter") -> "_EditOpsCounter":
+        """
+        Add the counts of `other`, taking its operations to come after the
+        ones already counted here. Word ids of `other` are mapped to this
+        counter's vocabulary.
+        """
+        self._flush()
+        other._flush()
+
+        # Index 0 is for the missing word id, -1
+        ids = np.array(
+            [-1] + self.vocabulary.encode(other.vocabulary.id2word), dtype=np.int64
+        )
+        truth_ids = ids[other.keys >> 32]
+        pred_ids = ids[other.keys & 0xFFFFFFFF]
+
+        self._combine(
+            ((truth_ids + 1) << 32) | (pred_ids + 1),
+            other.first + self.seen,
+            other.counts,
+        )
+        self.seen += other.seen
+
+        return self
+
+    def rows(self) -> List[Dict[str, Any]]:
+        """
+        Counts of each distinct operation, in the order operations first occur.
+        """
+        self._flush()
+        order = np.argsort(self.first, kind="stable")
+        words = ["***"] + self.vocabulary.id2word
+
+        rows = []
+        for key, count in zip(self.keys[order].tolist(), self.counts[order].tolist()):
+            truth, pred = words[key >> 32], words[key & 0xFFFFFFFF]
+            if key >> 32 == 0:
+                operation = "insertion"
+            elif key & 0xFFFFFFFF == 0:
+                operation = "deletion"
+            else:
+                operation = "substitution"
+            rows.append(
+                {"operation": operation, "truth": truth, "pred": pred, "count": count}
+            )
+
+        return rows
+
+
+def _alignment_ops(alignment: Alignment) -> Iterable[Tuple[str, str, str]]:
+    """
+    (operation, truth word, predicted word) for each word level edit operation
+    of `alignment`, with "***" standing in for missing words.
+    """
+    truth, pred = alignment.truth_raw, alignment.hypothesis_raw
+
+    for op in alignment.editops:
+        if op[0] == "insert":
+            yield "insertion", "***", pred[op[2]]
+        elif op[0] == "delete":
+            yield "deletion", truth[op[1]], "***"
+        else:
+            yield "substitution", truth[op[1]], pred[op[2]]
+
+
+class _TopEditOps:
+    """
+    Approximate counts of the `k` most frequent word level edit operations,
+    from a `SpaceSaving` summary of `capacity` operations. Memory stays bounded
+    however many operations are added. Rows carry the error bound of each
+    count, the true count lies between `count - error` and `count`.
+    """
+
+    columns = ["operation", "truth", "pred", "count", "error"]
+
+    def __init__(self, k: int, capacity: int = None):
+        self.k = k
+        self.summary: SpaceSaving[Tuple[str, str, str]] = SpaceSaving(
+            capacity if capacity is not None else 10 * k
         )
 
-    return ops
+    def add_alignment(self, alignment: Alignment):
+        for op in _alignment_ops(alignment):
+            self.summary.add(op)
+
+    def empty(self) -> "_TopEditOps":
+        return _TopEditOps(self.k, self.summary.capacity)
+
+    def merge(self, other: "_TopEditOps") -> "_TopEditOps":
+        self.summary.merge(other.summary)
+        return self
+
+    def rows(self) -> List[Dict[str, Any]]:
+        return [
+            {
+                "operation": op[0],
+                "truth": op[1],
+                "pred": op[2],
+                "count": count,
+                "error": error,
+            }
+            for op, count, error in self.summary.top(self.k)
+        ]
 
 
-def get_alt_metric(truth: str, predictions: List[str], metric) -> List[float]:
+# Word operation counters behind the ops tables of the reports
+_OpsCounter = Union[_EditOpsCounter, _TopEditOps]
+
+
+def get_alt_metric(
+    truth: str, predictions: List[str], metric, **kwargs
+) -> List[float]:
     """
-    Get a metric over a list of prediction alternatives
+    Get a metric over a list of prediction alternatives. `kwargs` are passed on
+    to `metric`. The `wer`, `mer`, `wip` and `wil` measures are computed with
+    one n-best alignment call.
     """
+    if metric in (wer, mer, wip, wil):
+        name = metric.__name__
+        return [
+            measures[name]
+            for measures in compute_asr_measures_nbest(
+                truth, predictions, metrics=(name,), **kwargs
+            )
+        ]
+
     results = []
     for pred in predictions:
-        results.append(metric(truth, pred))
+        results.append(metric(truth, pred, **kwargs))
     return results
 
 
@@ -495,20 +1379,52 @@ def merge_utterances(utterances):
     def _join_transcripts(transcripts):
         return " ".join(text.strip() for text in transcripts if text != None)
 
-    indexed_results = [enumerate(utt) for utt in utterances]
-
-    for tup in itertools.product(*indexed_results):
-        if tup:
-            index_sum = sum(idx for idx, _ in tup)
+    def _rank(confidence):
+        return -confidence or 0
+
+    # Merged alternatives are ranked by index sum first, so only the index
+    # tuples of the lowest sums are ever built, one sum at a time. Within a
+    # sum the tuples come in the cross product order and the stable sort on
+    # confidence keeps ties in that order.
+    sizes = [len(utt) for utt in utterances]
+    for index_sum in range(sum(sizes) - len(sizes) + 1):
+        if len(merged) >= _MAX_ALTERNATIVES:
+            break
+
+        candidates = []
+        for indices in _index_tuples(sizes, index_sum):
+            alts = [utt[idx] for utt, idx in zip(utterances, indices)]
+            candidates.append(
+                (reduce(mul, [alt["confidence"] or 0 for alt in alts]), alts)
+            )
+
+        for confidence, alts in sorted(candidates, key=lambda it: _rank(it[0])):
             # NOTE: We lose fields other than transcript and confidence here.
-            alternative = {
-                "transcript": _join_transcripts([alt["transcript"] for _, alt in tup]),
-                "confidence": reduce(mul, [alt["confidence"] or 0 for _, alt in tup]),
-            }
-            merged.append((index_sum, alternative))
+            merged.append(
+                {
+                    "transcript": _join_transcripts([alt["transcript"] for alt in alts]),
+                    "confidence": confidence,
+                }
+            )
 
-    merged = sorted(merged, key=lambda it: (it[0], -it[1]["confidence"] or 0))[:10]
-    return [[alt for _, alt in merged]]
+    return [merged[:_MAX_ALTERNATIVES]]
+
+
+def _index_tuples(sizes: List[int], total: int) -> Iterable[Tuple[int, ...]]:
+    """
+    Tuples of indices into lists of the given `sizes` that sum to `total`,
+    in lexicographic order.
+    """
+    if not sizes:
+        if total == 0:
+            yield ()
+        return
+
+    # Largest index sum the lists after the first one can make up
+    rest_max = sum(sizes[1:]) - len(sizes[1:])
+    for first in range(max(0, total - rest_max), min(sizes[0] - 1, total) + 1):
+        for rest in _index_tuples(sizes[1:], total - first):
+            yield (first,) + rest
 
 
 def get_n_transcripts(utterances, n=3) -> List[str]:
@@ -541,116 +1457,653 @@ def get_first_transcript(utterances) -> str:
         return ""
 
 
-def asr_report(
-    true_labels: pd.DataFrame, pred_labels: pd.DataFrame, dump: bool = False
-) -> Union[pd.DataFrame, Tuple[pd.DataFrame, pd.DataFrame]]:
+def _ratio(numerator: float, denominator: float) -> float:
     """
-    Generate ASR report based on true and predicted labels.
+    `numerator / denominator`, NaN when there is nothing to divide by.
+    """
+    return numerator / denominator if denominator > 0 else np.nan
 
-    `true_labels` is a CSV following TranscriptionLabel protobuf definition
-    from dataframes. While `pred_labels` follows RichTranscriptionLabel
-    protobuf definition.
 
-    The report covers the following metrics:
-    - WER: Mean WER over all the utterances.
-    - Utterance FPR: Ratio of utterances where truth is empty but prediction is non-empty.
-    - Utterance FNR: Ratio of utterances where predictions are empty, while the truth is non-empty.
+def corpus_measures(
+    counts: Union[pd.DataFrame, Mapping[str, np.ndarray]], mask=None
+) -> Dict[str, float]:
+    """
+    Corpus level WER, MER and CER from per utterance operation counts, summed
+    before taking the ratios like Kaldi's compute-wer does.
+    :param counts: per utterance `COUNT_COLUMNS`, like the `asr_report` dump
+    :param mask: optional boolean mask to aggregate over a subset of utterances
+    :return: a dict with corpus `wer`, `mer` and `cer`, NaN for utterances
+        without reference words
     """
+    totals = {}
+    for name in COUNT_COLUMNS:
+        values = np.asarray(counts[name])
+        if mask is not None:
+            values = values[np.asarray(mask, dtype=bool)]
+        totals[name] = int(values.sum())
 
-    # TODO: Add min-k variant
+    H, S, D, I = (totals[name] for name in COUNT_COLUMNS[:4])
+    cH, cS, cD, cI = (totals[name] for name in COUNT_COLUMNS[4:])
+
+    return {
+        "wer": _ratio(S + D + I, H + S + D),
+        "mer": _ratio(S + D + I, H + S + D + I),
+        "cer": _ratio(cS + cD + cI, cH + cS + cD),
+    }
+
+
+def _score_alternatives(
+    truths: List[str],
+    alternatives: List[List[str]],
+    vocabulary: Vocabulary = None,
+    memo: AlignmentMemo = None,
+    ops: Optional[_OpsCounter] = None,
+    group_ops: Optional[Dict[Any, _OpsCounter]] = None,
+    groups: Optional[List[Any]] = None,
+) -> Dict[str, Any]:
+    """
+    WER of each alternative against its truth, along with the operation counts
+    of the first alternative. With `ops`, the word operations of the first
+    alternatives are counted in it too. With `group_ops` and per row `groups`,
+    they are also counted in the counter of each row's group.
+    :return: a dict with per row WER lists under `all_wer`, and per row
+        `COUNT_COLUMNS` arrays
+    """
+    vocabulary = Vocabulary() if vocabulary is None else vocabulary
+
+    # Transforms run over whole columns, then each truth is aligned against
+    # all its alternatives at once
+    truth_words = _transform_series(pd.Series(truths, dtype=object), _default_transform)
+    alternative_words = _transform_series(
+        pd.Series(list(itertools.chain.from_iterable(alternatives)), dtype=object),
+        _default_transform,
+    )
+    offsets = np.concatenate([[0], np.cumsum([len(alts) for alts in alternatives])])
+
+    all_wer = []
+    # Columns are word and then character hits, substitutions, deletions and insertions
+    counts = np.zeros((len(truth_words), len(COUNT_COLUMNS)), dtype=np.int64)
+    for idx, truth in enumerate(truth_words):
+        alignments = _align_nbest(
+            truth,
+            alternative_words[offsets[idx] : offsets[idx + 1]],
+            vocabulary,
+            memo,
+        )
+        counts[idx] = alignments[0].counts + alignments[0].char_counts
+        all_wer.append([alignment.wer for alignment in alignments])
+
+        if ops is not None:
+            ops.add_alignment(alignments[0])
+        if group_ops is not None and groups is not None:
+            group_ops[groups[idx]].add_alignment(alignments[0])
+
+    scores: Dict[str, Any] = {"all_wer": all_wer}
+    scores.update({name: counts[:, idx] for idx, name in enumerate(COUNT_COLUMNS)})
+
+    return scores
+
+
+def _empty_ops(ops: Optional[_OpsCounter]) -> Optional[_OpsCounter]:
+    return None if ops is None else ops.empty()
+
+
+def _empty_group_ops(
+    group_ops: Optional[Dict[Any, _OpsCounter]]
+) -> Optional[Dict[Any, _OpsCounter]]:
+    if group_ops is None:
+        return None
+
+    return {group: counter.empty() for group, counter in group_ops.items()}
+
+
+def _merge_ops(ops: Optional[_OpsCounter], other: Any):
+    """
+    Add the counts of `other`, a counter of the same kind as `ops`.
+    """
+    if ops is not None:
+        ops.merge(other)
+
+
+def _merge_group_ops(group_ops: Optional[Dict[Any, _OpsCounter]], other: Any):
+    """
+    Add the counts of each group of `other`, made by `_empty_group_ops`.
+    """
+    if group_ops is not None:
+        for group, counter in group_ops.items():
+            counter.merge(other[group])
+
+
+def _score_chunk(
+    truths: List[str],
+    alternatives: List[List[str]],
+    memo_size: int,
+    ops: Optional[_OpsCounter],
+    group_ops: Optional[Dict[Any, _OpsCounter]],
+    groups: Optional[List[Any]],
+) -> Tuple[
+    Dict[str, Any], int, int, Optional[_OpsCounter], Optional[Dict[Any, _OpsCounter]]
+]:
+    vocabulary = Vocabulary()
+    memo = AlignmentMemo(memo_size) if memo_size > 0 else None
+    scores = _score_alternatives(
+        truths, alternatives, vocabulary, memo, ops, group_ops, groups
+    )
+
+    if memo is None:
+        return scores, 0, 0, ops, group_ops
+
+    return scores, memo.hits, memo.misses, ops, group_ops
+
+
+def _score_alternatives_parallel(
+    truths: List[str],
+    alternatives: List[List[str]],
+    workers: int,
+    memo: AlignmentMemo = None,
+    ops: Optional[_OpsCounter] = None,
+    group_ops: Optional[Dict[Any, _OpsCounter]] = None,
+    groups: Optional[List[Any]] = None,
+) -> Dict[str, Any]:
+    """
+    `_score_alternatives` over chunks of rows in a pool of `workers`
+    processes. Workers inherit the compiled module level transforms and the
+    results are put back in the input order.
+
+    With a `memo`, each chunk is scored with a memo of the same size and the
+    lookup counts of all the chunks are added to `memo`. With `ops` or
+    `group_ops`, each chunk counts operations on its own and the counts are
+    merged in order.
+    """
+    # A few chunks per worker evens out the load across workers
+    bounds = np.linspace(0, len(truths), workers * 4 + 1, dtype=np.int64)
+    chunks = [(start, end) for start, end in zip(bounds[:-1], bounds[1:]) if end > start]
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        scored = list(
+            executor.map(
+                _score_chunk,
+                [truths[start:end] for start, end in chunks],
+                [alternatives[start:end] for start, end in chunks],
+                itertools.repeat(0 if memo is None else memo.max_size),
+                [_empty_ops(ops) for _ in chunks],
+                [_empty_group_ops(group_ops) for _ in chunks],
+                [None if groups is None else groups[start:end] for start, end in chunks],
+            )
+        )
+
+    if memo is not None:
+        memo.hits += sum(hits for _, hits, _, _, _ in scored)
+        memo.misses += sum(misses for _, _, misses, _, _ in scored)
+
+    for _, _, _, chunk_ops, chunk_group_ops in scored:
+        _merge_ops(ops, chunk_ops)
+        _merge_group_ops(group_ops, chunk_group_ops)
+
+    chunk_scores = [scores for scores, _, _, _, _ in scored]
+    if not chunk_scores:
+        return _score_alternatives([], [])
+
+    scores: Dict[str, Any] = {
+        "all_wer": list(itertools.chain.from_iterable(s["all_wer"] for s in chunk_scores))
+    }
+    for name in COUNT_COLUMNS:
+        scores[name] = np.concatenate([s[name] for s in chunk_scores])
+
+    return scores
+
+
+@dataclass
+class ASRReportAccumulator:
+    """
+    Mergeable sums behind the `asr_report` metrics. Scored utterances are
+    folded in with `update`, accumulators over separate parts of a dataset
+    are combined with `merge` and `report` gives the final report.
+    """
+
+    min_k: Tuple[int, ...] = (3, _MAX_ALTERNATIVES)
+    utterances: int = 0
+    wer_sum: float = 0.0
+    erroneous: int = 0
+    min_wer_sums: Dict[int, float] = field(default_factory=dict)
+    empty_truths: int = 0
+    empty_truths_non_empty_preds: int = 0
+    non_empty_truths: int = 0
+    non_empty_truths_empty_preds: int = 0
+    short_utterances: int = 0
+    short_wer_sum: float = 0.0
+    long_utterances: int = 0
+    long_wer_sum: float = 0.0
+    counts: Dict[str, int] = field(
+        default_factory=lambda: dict.fromkeys(COUNT_COLUMNS, 0)
+    )
+    memo_hits: int = 0
+    memo_misses: int = 0
+
+    def update(self, scored: pd.DataFrame) -> "ASRReportAccumulator":
+        """
+        Fold in utterances scored by `_score_frame`.
+        """
+        wer = scored["wer"].to_numpy(dtype=np.float64)
+        length = scored["length"].to_numpy()
+        empty_truth = (scored["transcription"] == "").to_numpy()
+        empty_pred = (scored["pred_transcription"] == "").to_numpy()
+
+        self.utterances += len(scored)
+        self.wer_sum += float(wer.sum())
+        # sentence error rate = number of sentences with error / number of sentences
+        self.erroneous += int((wer > 0).sum())
+
+        for k in self.min_k:
+            self.min_wer_sums[k] = self.min_wer_sums.get(k, 0.0) + float(
+                scored[f"min_{k}_wer"].to_numpy(dtype=np.float64).sum()
+            )
+
+        self.empty_truths += int(empty_truth.sum())
+        self.empty_truths_non_empty_preds += int((empty_truth & ~empty_pred).sum())
+        self.non_empty_truths += int((~empty_truth).sum())
+        self.non_empty_truths_empty_preds += int((~empty_truth & empty_pred).sum())
+
+        short = (length > 0) & (length < _SHORT_UTTERANCE_LEN)
+        long = length >= _SHORT_UTTERANCE_LEN
+        self.short_utterances += int(short.sum())
+        self.short_wer_sum += float(wer[short].sum())
+        self.long_utterances += int(long.sum())
+        self.long_wer_sum += float(wer[long].sum())
+
+        for name in COUNT_COLUMNS:
+            self.counts[name] += int(scored[name].sum())
+
+        return self
+
+    def merge(self, other: "ASRReportAccumulator") -> "ASRReportAccumulator":
+        """
+        Add the sums of `other` to this accumulator.
+        """
+        if tuple(self.min_k) != tuple(other.min_k):
+            raise ValueError(
+                f"can't merge accumulators over min-k {self.min_k} and {other.min_k}"
+            )
+
+        for name in [
+            "utterances",
+            "wer_sum",
+            "erroneous",
+            "empty_truths",
+            "empty_truths_non_empty_preds",
+            "non_empty_truths",
+            "non_empty_truths_empty_preds",
+            "short_utterances",
+            "short_wer_sum",
+            "long_utterances",
+            "long_wer_sum",
+            "memo_hits",
+            "memo_misses",
+        ]:
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+
+        for k, value in other.min_wer_sums.items():
+            self.min_wer_sums[k] = self.min_wer_sums.get(k, 0.0) + value
+
+        for name, value in other.counts.items():
+            self.counts[name] += value
+
+        return self
+
+    def report(self) -> pd.DataFrame:
+        fpr = (
+            self.empty_truths_non_empty_preds / self.empty_truths
+            if self.empty_truths > 0
+            else 0
+        )
+        fnr = (
+            self.non_empty_truths_empty_preds / self.non_empty_truths
+            if self.non_empty_truths > 0
+            else 0
+        )
+        # WER over the corpus (like this → https://kaldi-asr.org/doc/compute-wer_8cc.html)
+        corpus = corpus_measures({name: [value] for name, value in self.counts.items()})
+
+        rows = [
+            ("WER", _ratio(self.wer_sum, self.utterances), self.utterances),
+            ("Utterance FPR", fpr, self.empty_truths),
+            ("Utterance FNR", fnr, self.non_empty_truths),
+            ("SER", _ratio(self.erroneous, self.utterances), self.utterances),
+        ]
+        for k in self.min_k:
+            label = "Min WER" if k == _MAX_ALTERNATIVES else f"Min {k} WER"
+            rows.append(
+                (label, _ratio(self.min_wer_sums.get(k, 0.0), self.utterances), self.utterances)
+            )
+        rows.extend(
+            [
+                (
+                    "Short Utterance WER",
+                    _ratio(self.short_wer_sum, self.short_utterances),
+                    self.short_utterances,
+                ),
+                (
+                    "Long Utterance WER",
+                    _ratio(self.long_wer_sum, self.long_utterances),
+                    self.long_utterances,
+                ),
+                ("Corpus WER", corpus["wer"], self.utterances),
+                ("Corpus MER", corpus["mer"], self.utterances),
+                ("Corpus CER", corpus["cer"], self.utterances),
+            ]
+        )
+
+        memo_lookups = self.memo_hits + self.memo_misses
+        if memo_lookups > 0:
+            rows.append(
+                ("Alignment Memo Hit Rate", self.memo_hits / memo_lookups, memo_lookups)
+            )
+
+        report = pd.DataFrame(rows, columns=["Metric", "Value", "Support"])
+        report.set_index("Metric", inplace=True)
+        return report
+
+
+def _merge_labels(true_labels: pd.DataFrame, pred_labels: pd.DataFrame) -> pd.DataFrame:
     df = pd.merge(true_labels, pred_labels, on="id", how="inner")
     # Since empty items in true transcription is read as NaN, we have to
     # replace them
     df["transcription"] = df["transcription"].fillna("")
 
+    return df
+
+
+def _pad_rows(rows: List[List[float]], fill: float = np.inf) -> np.ndarray:
+    """
+    Stack rows of different lengths in a matrix, padding them with `fill`.
+    """
+    matrix = np.full((len(rows), max(map(len, rows), default=1)), fill)
+    for idx, row in enumerate(rows):
+        matrix[idx, : len(row)] = row
+
+    return matrix
+
+
+def _check_min_k(min_k: Iterable[int]) -> Tuple[int, ...]:
+    # Repeated numbers would give repeated report rows
+    min_k = tuple(dict.fromkeys(min_k))
+    if not min_k or any(not 1 <= k <= _MAX_ALTERNATIVES for k in min_k):
+        raise ValueError(
+            f"expected numbers of alternatives from 1 to {_MAX_ALTERNATIVES}, got {min_k}"
+        )
+
+    return min_k
+
+
+def _score_frame(
+    df: pd.DataFrame,
+    workers: int = 1,
+    vocabulary: Vocabulary = None,
+    min_k: Tuple[int, ...] = (3, _MAX_ALTERNATIVES),
+    memo: AlignmentMemo = None,
+    ops: Optional[_OpsCounter] = None,
+    group_ops: Optional[Dict[Any, _OpsCounter]] = None,
+    groups: Optional[List[Any]] = None,
+) -> pd.DataFrame:
+    """
+    Add per utterance scores to merged true and predicted labels. With `ops`,
+    the word operations of the first alternatives are counted in it. With
+    `group_ops` and per row `groups`, they are counted in the counter of each
+    row's group.
+    """
     # TODO: Do validation on type of input
     df["utterances"] = df["utterances"].apply(
         lambda it: merge_utterances(json.loads(it))
     )
 
     df["all_pred_transcriptions"] = df["utterances"].apply(
-        get_n_transcripts, args=(10,)
+        get_n_transcripts, args=(_MAX_ALTERNATIVES,)
     )
 
     df["pred_transcription"] = df["all_pred_transcriptions"].map(lambda x: x[0])
 
-    df["all_wer"] = df.apply(
-        lambda row: get_alt_metric(
-            row["transcription"], row["all_pred_transcriptions"], wer
-        ),
-        axis=1,
-    )
+    # Operation counts of the first alternative come from the same pass and
+    # are kept per row, so corpus measures can be re-aggregated on any subset
+    if workers > 1:
+        scores = _score_alternatives_parallel(
+            df["transcription"].tolist(),
+            df["all_pred_transcriptions"].tolist(),
+            workers,
+            memo,
+            ops,
+            group_ops,
+            groups,
+        )
+    else:
+        scores = _score_alternatives(
+            df["transcription"].tolist(),
+            df["all_pred_transcriptions"].tolist(),
+            vocabulary,
+            memo,
+            ops,
+            group_ops,
+            groups,
+        )
+
+    for name, values in scores.items():
+        df[name] = values
 
     df["wer"] = df["all_wer"].map(lambda x: x[0])
 
-    for n in [3, 10]:
-        df[f"min_{n}_wer"] = df.apply(
-            lambda row: min(row["all_wer"][:n]),
-            axis=1,
-        )
+    # Best WER within the first k alternatives, for every k at once
+    min_wer = np.minimum.accumulate(_pad_rows(df["all_wer"].tolist()), axis=1)
+    for k in min_k:
+        df[f"min_{k}_wer"] = min_wer[:, min(k, min_wer.shape[1]) - 1]
 
-    (utterance_fpr, total_empty), (utterance_fnr, total_non_empty) = fpr_fnr(
-        df["transcription"] == "", df["pred_transcription"] == "", labels=[False, True]
-    )
+    df["length"] = df["transcription"].str.split().str.len()
 
-    # sentence error rate = number of sentences with error / number of sentences
-    ser = len(list(filter(lambda x: x > 0, df["wer"].tolist()))) / len(df["wer"])
-
-    # short utterance WER. Short deifined as less than or equal to 2 words
-    short_utterance_len = 3
-    df["length"] = df["transcription"].apply(lambda x: len(x.strip().split()))
-    short_utterance_df = df[(df["length"] > 0) & (df["length"] < short_utterance_len)]
-
-    # long utterance WER
-    long_utterance_df = df[df["length"] >= short_utterance_len]
-
-    # TODO: Find WER over the corpus (like this → https://kaldi-asr.org/doc/compute-wer_8cc.html)
-    report = pd.DataFrame(
-        {
-            "Metric": [
-                "WER",
-                "Utterance FPR",
-                "Utterance FNR",
-                "SER",
-                "Min 3 WER",
-                "Min WER",
-                "Short Utterance WER",
-                "Long Utterance WER",
-            ],
-            "Value": [
-                df["wer"].mean(),
-                utterance_fpr,
-                utterance_fnr,
-                ser,
-                df["min_3_wer"].mean(),
-                df["min_10_wer"].mean(),
-                short_utterance_df["wer"].mean(),
-                long_utterance_df["wer"].mean(),
-            ],
-            "Support": [
-                len(df),
-                total_empty,
-                total_non_empty,
-                len(df),
-                len(df),
-                len(df),
-                len(short_utterance_df),
-                len(long_utterance_df),
-            ],
-        }
+    return df
+
+
+def _ops_counter(vocabulary: Vocabulary, top_k: int = None) -> _OpsCounter:
+    if top_k is not None:
+        return _TopEditOps(top_k)
+
+    return _EditOpsCounter(vocabulary)
+
+
+def _ops_frame(ops: _OpsCounter) -> pd.DataFrame:
+    return pd.DataFrame(ops.rows(), columns=ops.columns).sort_values(
+        by=["operation", "count"], ascending=[True, False]
     )
-    report.set_index("Metric", inplace=True)
-    if dump:
-        ops = pd.DataFrame(
-            get_ops(df["transcription"], df["pred_transcription"])
-        ).sort_values(by=["operation", "count"], ascending=[True, False])
 
-        return report, df, ops
+
+def asr_report(
+    true_labels: pd.DataFrame,
+    pred_labels: pd.DataFrame,
+    dump: bool = False,
+    workers: int = 1,
+    memo_size: int = 0,
+    min_k: Iterable[int] = (3, _MAX_ALTERNATIVES),
+    ops_top_k: int = None,
+) -> Union[pd.DataFrame, Tuple[pd.DataFrame, pd.DataFrame]]:
+    """
+    Generate ASR report based on true and predicted labels.
+
+    `true_labels` is a CSV following TranscriptionLabel protobuf definition
+    from dataframes. While `pred_labels` follows RichTranscriptionLabel
+    protobuf definition.
+
+    With `workers` > 1, the utterances are scored in chunks over a pool of
+    that many processes. The report is the same as with a single worker.
+
+    With `memo_size` > 0, alignments of repeated (truth, alternative) pairs
+    are kept in an `AlignmentMemo` of that many entries and reused, and the
+    memo hit rate is added to the report. With multiple workers, each chunk
+    of utterances has its own memo.
+
+    `min_k` are the numbers of leading alternatives, from 1 to 10, to report
+    the oracle WER over, as "Min k WER" rows. The row for 10, all the
+    alternatives kept, is "Min WER".
+
+    With `dump` and `ops_top_k`, the ops table only has the `ops_top_k` most
+    frequent operations, counted approximately in bounded memory, with an
+    `error` column bounding how much each count is over the true one.
+
+    The report covers the following metrics:
+    - WER: Mean WER over all the utterances.
+    - Utterance FPR: Ratio of utterances where truth is empty but prediction is non-empty.
+    - Utterance FNR: Ratio of utterances where predictions are empty, while the truth is non-empty.
+    - Corpus WER, MER and CER: Rates over the summed operation counts of all utterances.
+    """
+
+    min_k = _check_min_k(min_k)
+    df = _merge_labels(true_labels, pred_labels)
+
+    # Word ids are shared over the whole run, seeded with the truth corpus
+    vocabulary = Vocabulary.from_corpus(df["transcription"])
+
+    memo = AlignmentMemo(memo_size) if memo_size > 0 else None
+    # Operations are counted from the alignments of the scoring pass
+    ops = _ops_counter(vocabulary, ops_top_k) if dump else None
+    df = _score_frame(df, workers, vocabulary, min_k=min_k, memo=memo, ops=ops)
+
+    accumulator = ASRReportAccumulator(min_k=min_k).update(df)
+    if memo is not None:
+        accumulator.memo_hits, accumulator.memo_misses = memo.hits, memo.misses
+    report = accumulator.report()
+
+    if dump:
+        assert ops is not None
+        return report, df, _ops_frame(ops)
 
     else:
         return report
 
 
+def asr_report_slices(
+    true_labels: pd.DataFrame,
+    pred_labels: pd.DataFrame,
+    slice_by: str,
+    slices: Iterable[Any] = None,
+    dump: bool = False,
+    workers: int = 1,
+    memo_size: int = 0,
+    min_k: Iterable[int] = (3, _MAX_ALTERNATIVES),
+    ops_top_k: int = None,
+) -> Dict[Any, Union[pd.DataFrame, Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]]]:
+    """
+    Generate an `asr_report` for each slice of the utterances, as given by the
+    values of the `slice_by` column of the true or predicted labels.
+
+    Utterances are merged, parsed and scored once. Each slice's report is then
+    summed from the per utterance scores of its rows, and with `dump`, its ops
+    table is counted from the alignments of its rows.
+
+    `slices` picks the values to report on, and their order. All the values
+    of `slice_by`, sorted, are reported if not given. The other arguments are
+    like in `asr_report`. With `dump`, the breakdowns don't have the
+    `slice_by` column.
+
+    Returns a dict of slice value to what `asr_report` would give for it.
+    """
+    min_k = _check_min_k(min_k)
+    df = _merge_labels(true_labels, pred_labels)
+
+    if slices is None:
+        slices = sorted(df[slice_by].dropna().unique())
+
+    # Word ids are shared over the whole run, seeded with the truth corpus
+    vocabulary = Vocabulary.from_corpus(df["transcription"])
+
+    codes, values = pd.factorize(df[slice_by])
+    memo = AlignmentMemo(memo_size) if memo_size > 0 else None
+    group_ops = (
+        {code: _ops_counter(vocabulary, ops_top_k) for code in set(codes.tolist())}
+        if dump
+        else None
+    )
+    df = _score_frame(
+        df,
+        workers,
+        vocabulary,
+        min_k=min_k,
+        memo=memo,
+        group_ops=group_ops,
+        groups=codes.tolist(),
+    )
+
+    reports = {}
+    for value in slices:
+        code = values.get_loc(value) if value in values else None
+        mask = codes == code
+
+        accumulator = ASRReportAccumulator(min_k=min_k).update(df[mask])
+        if memo is not None:
+            # The memo is shared by all the slices
+            accumulator.memo_hits, accumulator.memo_misses = memo.hits, memo.misses
+        report = accumulator.report()
+
+        if group_ops is not None:
+            slice_ops = group_ops.get(code, _ops_counter(vocabulary, ops_top_k))
+            reports[value] = (
+                report,
+                df[mask].drop(columns=[slice_by]).reset_index(drop=True),
+                _ops_frame(slice_ops),
+            )
+        else:
+            reports[value] = report
+
+    return reports
+
+
+def asr_report_streaming(
+    true_labels_path: str,
+    pred_labels_path: str,
+    chunksize: int = 100000,
+    workers: int = 1,
+    memo_size: int = 0,
+    min_k: Iterable[int] = (3, _MAX_ALTERNATIVES),
+    ops_top_k: int = None,
+) -> Union[pd.DataFrame, Tuple[pd.DataFrame, pd.DataFrame]]:
+    """
+    Generate the `asr_report` report while reading predicted labels in chunks.
+
+    The true labels are loaded once as an id index. Each chunk of `chunksize`
+    predicted labels is joined against it, scored and folded into an
+    `ASRReportAccumulator`, so memory stays bounded by the chunk size rather
+    than growing with the number of predictions. Values match `asr_report`
+    up to floating point summation order. A memo of `memo_size` alignments
+    is shared across the chunks. `min_k` is like in `asr_report`.
+
+    With `ops_top_k`, the approximate table of the most frequent operations,
+    like `asr_report` gives with `dump`, is returned along with the report.
+    """
+    min_k = _check_min_k(min_k)
+    true_labels = pd.read_csv(
+        true_labels_path, usecols=["id", "transcription"]
+    ).set_index("id")
+    true_labels["transcription"] = true_labels["transcription"].fillna("")
+
+    # Grown chunk by chunk, as seeding it from all the truths would tokenize
+    # them all at once
+    vocabulary = Vocabulary()
+    memo = AlignmentMemo(memo_size) if memo_size > 0 else None
+    accumulator = ASRReportAccumulator(min_k=min_k)
+    ops = _TopEditOps(ops_top_k) if ops_top_k is not None else None
+
+    for pred_labels in pd.read_csv(
+        pred_labels_path, usecols=["id", "utterances"], chunksize=chunksize
+    ):
+        df = pred_labels.join(true_labels, on="id", how="inner")
+        accumulator.update(
+            _score_frame(df, workers, vocabulary, min_k=min_k, memo=memo, ops=ops)
+        )
+
+    if memo is not None:
+        accumulator.memo_hits, accumulator.memo_misses = memo.hits, memo.misses
+
+    if ops is not None:
+        return accumulator.report(), _ops_frame(ops)
+
+    return accumulator.report()
+
+
 def extract_info_tags(transcription: str) -> List[str]:
     """
     Extracts info tags from an "annotated transcription", using a regex pattern.
@@ -671,13 +2124,9 @@ def extract_info_tags(transcription: str) -> List[str]:
         extract_info_tags("This is audible speech") = []
     """
 
-    match_obj = re.search(
-        "(\<.*?\>)|(<[a-z]+)|([a-z]+>)|([a-z]+_[a-z]+)|([a-z]+_)|(_[a-z]+)",
-        transcription,
-    )
+    match_obj = _INFO_TAG_PATTERN.search(transcription)
     if match_obj:
-        tags = [tag for tag in match_obj.groups() if tag]
-        return tags
+        return [match_obj.group(0)]
     return []
 
 
@@ -698,12 +2147,7 @@ def remove_info_tags(transcription: str) -> str:
         remove_info_tags("This is audible speech ") = "This is audible speech"
     """
 
-    transcription = re.sub(
-        "(\<.*?\>)|[`.,:;\[\]]]+|(<[a-z]+)|([a-z]+>)|([a-z]+_[a-z]+)|([a-z]+_)|(_[a-z]+)|~",
-        "",
-        transcription.strip(),
-    )
-    return transcription
+    return _INFO_TAG_REMOVAL_PATTERN.sub("", transcription.strip())
 
 
 ## change this if you want to change the definition of noisy
@@ -732,6 +2176,30 @@ def check_if_tags_is_noisy(tags: List[str]) -> int:
         return 0
 
 
+def annotate_noise_info(labels: pd.DataFrame) -> pd.DataFrame:
+    """
+    Vectorized `extract_info_tags`, `remove_info_tags` and
+    `check_if_tags_is_noisy` over the `transcription` column of `labels`.
+
+    Returns a copy of `labels` with the first info tag of each transcription
+    (NaN if there is none) as `info-tag`, the noise label as `noise-label` and
+    cleaned transcriptions.
+    """
+    df = labels.copy()
+    transcriptions = df["transcription"].fillna("").astype(object)
+
+    tags = transcriptions.str.extract(_INFO_TAG_PATTERN, expand=False)
+    df["info-tag"] = tags
+    df["noise-label"] = (
+        tags.notna() & ~tags.str.contains("silent", regex=False, na=False)
+    ).astype(int)
+    df["transcription"] = transcriptions.str.strip().str.replace(
+        _INFO_TAG_REMOVAL_PATTERN, "", regex=True
+    )
+
+    return df
+
+
 def process_noise_info(
     true_labels: pd.DataFrame, pred_labels: pd.DataFrame
 ) -> Tuple[Dict[str, pd.DataFrame], Dict[str, pd.DataFrame]]:
@@ -752,22 +2220,9 @@ def process_noise_info(
     any "info tags", then the subset for "not noisy" will be empty.
     """
 
-    df = pd.merge(true_labels, pred_labels, on="id", how="inner")
-
-    # Since empty items in true transcription is read as NaN, we have to
-    # replace them
-    df["transcription"].fillna("", inplace=True)
-
-    ## separate out info tags in transcripts and clean the original transcriptions
-    df["info-tags"] = df["transcription"].apply(
-        lambda transcription: extract_info_tags(transcription)
-    )
-    df["transcription"] = df["transcription"].apply(
-        lambda transcription: remove_info_tags(transcription)
-    )
+    df = annotate_noise_info(_merge_labels(true_labels, pred_labels))
 
     ## separate noisy and not-noisy subsets
-    df["noise-label"] = df["info-tags"].apply(lambda tag: check_if_tags_is_noisy(tag))
     noisy_df = df[df["noise-label"] == 1]
     not_noisy_df = df[df["noise-label"] != 1]
 
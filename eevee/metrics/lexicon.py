@@ -0,0 +1,173 @@
+import os
+from collections.abc import Mapping
+from hashlib import blake2b
+from typing import Dict, Iterable, Iterator, Literal, Optional
+
+import numpy as np
+
+# Arrays an index is made of, saved as one .npy file each
+_ARRAYS = ("hashes", "word_offsets", "word_bytes", "pron_offsets", "pron_chars")
+
+# Code point joining pronunciations of consecutive words
+_SEPARATOR = ord(" ")
+
+# Modes `np.load` can memory map arrays with
+MmapMode = Optional[Literal["r", "r+", "w+", "c"]]
+
+
+def _hash_word(word: str) -> int:
+    """
+    Stable 64 bit hash of a word, the same across processes and runs.
+    """
+    return int.from_bytes(blake2b(word.encode(), digest_size=8).digest(), "little")
+
+
+def _hash_words(words: Iterable[str]) -> np.ndarray:
+    return np.fromiter((_hash_word(word) for word in words), dtype=np.uint64)
+
+
+def _offsets(lengths: Iterable[int]) -> np.ndarray:
+    lengths = np.fromiter(lengths, dtype=np.int64)
+    offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    return offsets
+
+
+class LexiconIndex(Mapping):
+    """
+    Compact, read only word to pronunciation table.
+
+    Words get integer ids in the order of their sorted 64 bit hashes, so a
+    batch of words is looked up with a single `np.searchsorted`. Words and
+    pronunciations are packed in flat arrays with offsets, pronunciations as
+    unicode code points. All the arrays can be saved to a directory and
+    memory mapped back, so processes reading the same index share its pages
+    instead of each holding a dict of a few hundred thousand strings.
+
+    It is a `Mapping` from words to pronunciation strings and can be used in
+    place of a lexicon dict.
+    """
+
+    def __init__(
+        self,
+        hashes: np.ndarray,
+        word_offsets: np.ndarray,
+        word_bytes: np.ndarray,
+        pron_offsets: np.ndarray,
+        pron_chars: np.ndarray,
+    ):
+        self.hashes = hashes
+        self.word_offsets = word_offsets
+        self.word_bytes = word_bytes
+        self.pron_offsets = pron_offsets
+        self.pron_chars = pron_chars
+
+    @classmethod
+    def from_dict(cls, lexicon: Dict[str, str]) -> "LexiconIndex":
+        words = list(lexicon)
+        hashes = _hash_words(words)
+
+        order = np.argsort(hashes, kind="stable")
+        hashes = hashes[order]
+        if np.any(hashes[1:] == hashes[:-1]):
+            raise ValueError("lexicon has words with colliding hashes")
+
+        words = [words[idx] for idx in order]
+        encoded = [word.encode() for word in words]
+        prons = [lexicon[word] for word in words]
+
+        return cls(
+            hashes,
+            _offsets(len(word) for word in encoded),
+            np.frombuffer(b"".join(encoded), dtype=np.uint8),
+            _offsets(len(pron) for pron in prons),
+            np.frombuffer("".join(prons).encode("utf-32-le"), dtype="<u4"),
+        )
+
+    def save(self, path: str):
+        """
+        Write the index as a directory of .npy files.
+        """
+        os.makedirs(path, exist_ok=True)
+        for name in _ARRAYS:
+            np.save(os.path.join(path, f"{name}.npy"), getattr(self, name))
+
+    @classmethod
+    def load(cls, path: str, mmap_mode: MmapMode = "r") -> "LexiconIndex":
+        """
+        Read an index written by `save`, memory mapped unless `mmap_mode` is
+        None.
+        """
+        return cls(
+            *[
+                np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mmap_mode)
+                for name in _ARRAYS
+            ]
+        )
+
+    def __len__(self) -> int:
+        return len(self.hashes)
+
+    def __iter__(self) -> Iterator[str]:
+        for idx in range(len(self)):
+            yield self._word(idx)
+
+    def __contains__(self, word) -> bool:
+        return isinstance(word, str) and self.ids([word])[0] >= 0
+
+    def __getitem__(self, word: str) -> str:
+        idx = self.ids([word])[0] if isinstance(word, str) else -1
+        if idx < 0:
+            raise KeyError(word)
+
+        return self._pronunciation(idx)
+
+    def _word(self, idx: int) -> str:
+        start, end = self.word_offsets[idx], self.word_offsets[idx + 1]
+        return self.word_bytes[start:end].tobytes().decode()
+
+    def _pronunciation(self, idx: int) -> str:
+        start, end = self.pron_offsets[idx], self.pron_offsets[idx + 1]
+        return self.pron_chars[start:end].tobytes().decode("utf-32-le")
+
+    def ids(self, words: Iterable[str]) -> np.ndarray:
+        """
+        Ids of `words`, -1 for words not in the lexicon.
+        """
+        keys = _hash_words(words)
+        if not len(self):
+            return np.full(len(keys), -1, dtype=np.int64)
+
+        ids = np.minimum(np.searchsorted(self.hashes, keys), len(self) - 1)
+        return np.where(self.hashes[ids] == keys, ids, -1)
+
+    def phones(self, words: Iterable[str]) -> np.ndarray:
+        """
+        Code points of the pronunciations of `words`, joined by spaces.
+        Words not in the lexicon are skipped, like `" ".join` over a dict
+        lookup of the known words.
+        """
+        ids = self.ids(words)
+        ids = ids[ids >= 0]
+        if not len(ids):
+            return np.zeros(0, dtype="<u4")
+
+        starts = self.pron_offsets[ids]
+        lengths = self.pron_offsets[ids + 1] - starts
+
+        # Each pronunciation but the last is followed by a separator
+        out_starts = np.zeros(len(ids), dtype=np.int64)
+        np.cumsum(lengths[:-1] + 1, out=out_starts[1:])
+        out = np.full(out_starts[-1] + lengths[-1], _SEPARATOR, dtype="<u4")
+
+        within = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        out[np.repeat(out_starts, lengths) + within] = self.pron_chars[
+            np.repeat(starts, lengths) + within
+        ]
+        return out
+
+    def count_oov(self, words: Iterable[str]) -> int:
+        """
+        Number of `words` not in the lexicon.
+        """
+        return int(np.count_nonzero(self.ids(words) < 0))
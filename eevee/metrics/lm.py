@@ -0,0 +1,351 @@
+import os
+import re
+import weakref
+from array import array
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+from eevee.metrics.lexicon import MmapMode, _hash_word, _offsets
+
+# Sentence boundary words added around sentences, like in the ARPA models
+_SOS = "<s>"
+_EOS = "</s>"
+
+# Word that words out of the LM vocabulary are scored as
+_UNK = "<unk>"
+
+_NGRAM_SECTION_PATTERN = re.compile(r"^\\(\d+)-grams:$")
+
+
+class PerplexityScorer:
+    """
+    Sentence perplexities under an n-gram LM, like `arpa` models give them.
+
+    The LM vocabulary is read once into a frozenset, instead of once per
+    word, and n-gram log probabilities are memoized up to `memo_size`
+    entries, so n-grams shared by a reference and its alternatives are
+    looked up in the LM once.
+
+    The LM needs `vocabulary()`, `counts()`, `log_p_raw(ngram)` and `p(word)`,
+    which `arpa` models have.
+    """
+
+    def __init__(self, lm, memo_size: int = 1 << 20):
+        self.lm = lm
+        self.vocabulary = frozenset(lm.vocabulary())
+        self.order = max(order for order, _ in lm.counts())
+        self.memo_size = memo_size
+        self._log_probs: Dict[Tuple[str, ...], float] = {}
+
+    def log_p(self, ngram: Tuple[str, ...]) -> float:
+        """
+        Log10 probability of the last word of `ngram` given the others.
+        """
+        try:
+            return self._log_probs[ngram]
+        except KeyError:
+            log_prob = self.lm.log_p_raw(ngram)
+            if len(self._log_probs) < self.memo_size:
+                self._log_probs[ngram] = log_prob
+            return log_prob
+
+    def log_s(self, words: List[str]) -> float:
+        """
+        Log10 probability of a sentence of in vocabulary `words`, between
+        sentence boundaries.
+        """
+        words = [_SOS] + words + [_EOS]
+
+        # Histories longer than the LM order back off to the last n - 1 words
+        result = sum(
+            self.log_p(tuple(words[max(0, idx - self.order) : idx]))
+            for idx in range(1, len(words) + 1)
+        )
+        return result - self.log_p((_SOS,))
+
+    def perplexity(self, sent: Union[str, List[str]]) -> float:
+        """
+        Perplexity of a sentence, or of a list of words, over its words that
+        are in the LM vocabulary.
+
+        A single word is scored as a unigram. When that isn't possible, the
+        `<UNK>` probability stands in, and failing that the vocabulary size
+        of the LM, which is also the perplexity of sentences with no known
+        words.
+        """
+        if isinstance(sent, str):
+            sent = sent.split()
+
+        sent = [x for x in sent if x in self.vocabulary]
+        # Perplexity = 1 / (P(sent)**(1/len(sent)))
+        if len(sent) > 1:
+            return (1 / 10 ** self.log_s(sent)) ** (1 / len(sent))
+
+        if not sent:
+            return self.lm.counts()[0][1]
+
+        try:
+            return (1 / 10 ** self.log_p(tuple(sent))) ** (1 / len(sent))
+        except KeyError:
+            try:
+                return (1 / self.lm.p("<UNK>")) ** (1 / len(sent))
+            except KeyError:
+                return self.lm.counts()[0][1]
+
+    def perplexities(self, sentences: Iterable[Union[str, List[str]]]) -> List[float]:
+        """
+        Perplexities of many sentences, sharing the n-gram memo.
+        """
+        return [self.perplexity(sent) for sent in sentences]
+
+
+# Scorers of LMs passed around as is, kept as long as the LM is
+_SCORERS: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+
+
+def get_perplexity_scorer(lm) -> PerplexityScorer:
+    """
+    Return a `PerplexityScorer` of `lm`, reused across calls with the same LM.
+    """
+    if isinstance(lm, PerplexityScorer):
+        return lm
+
+    try:
+        return _SCORERS[lm]
+    except KeyError:
+        scorer = _SCORERS[lm] = PerplexityScorer(lm)
+        return scorer
+
+
+class NgramLM:
+    """
+    Backoff n-gram LM in flat, sorted arrays.
+
+    For each order, n-grams are kept as sorted 64 bit hashes of their words
+    along with float32 log10 probabilities and backoffs, so an n-gram is
+    found with a binary search. An ARPA file is parsed once with
+    `from_arpa`, saved as a directory of .npy files with `save` and memory
+    mapped back with `load`. That is near instant even for large models, and
+    processes loading the same files share their pages.
+
+    It has the parts of the `arpa` model interface that `PerplexityScorer`
+    and `_get_ppl` use.
+    """
+
+    def __init__(
+        self,
+        vocab_offsets: np.ndarray,
+        vocab_bytes: np.ndarray,
+        keys: List[np.ndarray],
+        log_probs: List[np.ndarray],
+        backoffs: List[np.ndarray],
+    ):
+        self.vocab_offsets = vocab_offsets
+        self.vocab_bytes = vocab_bytes
+        self.keys = keys
+        self.log_probs = log_probs
+        self.backoffs = backoffs
+        self._vocabulary: Optional[frozenset] = None
+
+    @classmethod
+    def from_arpa(cls, arpa_path: str) -> "NgramLM":
+        """
+        Parse an ARPA file. Only the parsed numbers and hashes are held while
+        reading, not an object per n-gram.
+        """
+        words: List[str] = []
+        keys: List[array] = []
+        log_probs: List[array] = []
+        backoffs: List[array] = []
+
+        order = 0
+        with open(arpa_path, encoding="utf-8") as fin:
+            for line in fin:
+                line = line.strip()
+                if not line:
+                    continue
+
+                match = _NGRAM_SECTION_PATTERN.match(line)
+                if match:
+                    order = int(match.group(1))
+                    while len(keys) < order:
+                        keys.append(array("Q"))
+                        log_probs.append(array("f"))
+                        backoffs.append(array("f"))
+                    continue
+
+                if line.startswith("\\"):
+                    order = 0
+                if not order:
+                    continue
+
+                fields = line.split()
+                ngram = fields[1 : order + 1]
+                if order == 1:
+                    words.append(ngram[0])
+
+                keys[order - 1].append(_hash_word(" ".join(ngram)))
+                log_probs[order - 1].append(float(fields[0]))
+                backoffs[order - 1].append(
+                    float(fields[order + 1]) if len(fields) > order + 1 else 0.0
+                )
+
+        if not keys:
+            raise ValueError(f"no n-grams found in {arpa_path}")
+
+        sorted_keys, sorted_log_probs, sorted_backoffs = [], [], []
+        for n, (order_keys, order_log_probs, order_backoffs) in enumerate(
+            zip(keys, log_probs, backoffs), 1
+        ):
+            key_array = np.frombuffer(order_keys, dtype=np.uint64)
+            idx = np.argsort(key_array, kind="stable")
+            sorted_order_keys = key_array[idx]
+            if np.any(sorted_order_keys[1:] == sorted_order_keys[:-1]):
+                raise ValueError(f"{n}-grams of {arpa_path} repeat or collide on their hashes")
+
+            sorted_keys.append(sorted_order_keys)
+            sorted_log_probs.append(np.frombuffer(order_log_probs, dtype=np.float32)[idx])
+            sorted_backoffs.append(np.frombuffer(order_backoffs, dtype=np.float32)[idx])
+
+        encoded = [word.encode() for word in words]
+        return cls(
+            _offsets(len(word) for word in encoded),
+            np.frombuffer(b"".join(encoded), dtype=np.uint8),
+            sorted_keys,
+            sorted_log_probs,
+            sorted_backoffs,
+        )
+
+    def save(self, path: str):
+        """
+        Write the LM as a directory of .npy files.
+        """
+        os.makedirs(path, exist_ok=True)
+        for n in range(1, self.order() + 1):
+            np.save(os.path.join(path, f"{n}-keys.npy"), self.keys[n - 1])
+            np.save(os.path.join(path, f"{n}-log_probs.npy"), self.log_probs[n - 1])
+            np.save(os.path.join(path, f"{n}-backoffs.npy"), self.backoffs[n - 1])
+
+        # The order is read back, not probed, so files of a higher order left
+        # by an earlier save are never loaded. The vocabulary is written
+        # last, so its presence marks a complete save
+        np.save(os.path.join(path, "order.npy"), np.array(self.order(), dtype=np.int64))
+        np.save(os.path.join(path, "vocab_bytes.npy"), self.vocab_bytes)
+        np.save(os.path.join(path, "vocab_offsets.npy"), self.vocab_offsets)
+
+    @classmethod
+    def load(cls, path: str, mmap_mode: MmapMode = "r") -> "NgramLM":
+        """
+        Read an LM written by `save`, memory mapped unless `mmap_mode` is
+        None.
+        """
+
+        def _load(name):
+            return np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mmap_mode)
+
+        order = int(np.load(os.path.join(path, "order.npy")))
+        return cls(
+            _load("vocab_offsets"),
+            _load("vocab_bytes"),
+            [_load(f"{n}-keys") for n in range(1, order + 1)],
+            [_load(f"{n}-log_probs") for n in range(1, order + 1)],
+            [_load(f"{n}-backoffs") for n in range(1, order + 1)],
+        )
+
+    def order(self) -> int:
+        return len(self.keys)
+
+    def counts(self) -> List[Tuple[int, int]]:
+        return [(n, len(keys)) for n, keys in enumerate(self.keys, 1)]
+
+    def vocabulary(self) -> frozenset:
+        if self._vocabulary is None:
+            self._vocabulary = frozenset(
+                self.vocab_bytes[start:end].tobytes().decode()
+                for start, end in zip(self.vocab_offsets[:-1], self.vocab_offsets[1:])
+            )
+        return self._vocabulary
+
+    def __contains__(self, word: str) -> bool:
+        return word in self.vocabulary()
+
+    def _find(self, ngram: Tuple[str, ...]) -> int:
+        """
+        Index of `ngram` in the arrays of its order, -1 if not in the LM.
+        """
+        if not 0 < len(ngram) <= self.order():
+            return -1
+
+        keys = self.keys[len(ngram) - 1]
+        key = np.uint64(_hash_word(" ".join(ngram)))
+        idx = int(np.searchsorted(keys, key))
+        return idx if idx < len(keys) and keys[idx] == key else -1
+
+    def log_p_raw(self, ngram: Tuple[str, ...]) -> float:
+        """
+        Log10 probability of the last word of `ngram` given the others,
+        backing off to shorter histories.
+        """
+        idx = self._find(ngram)
+        if idx >= 0:
+            return float(self.log_probs[len(ngram) - 1][idx])
+        if len(ngram) <= 1:
+            raise KeyError(ngram)
+
+        context = self._find(ngram[:-1])
+        log_bo = float(self.backoffs[len(ngram) - 2][context]) if context >= 0 else 0.0
+        return log_bo + self.log_p_raw(ngram[1:])
+
+    def _replace_unks(self, words: Iterable[str]) -> Tuple[str, ...]:
+        vocabulary = self.vocabulary()
+        return tuple(word if word in vocabulary else _UNK for word in words)
+
+    def log_p(self, ngram: Union[str, Tuple[str, ...]]) -> float:
+        words = ngram.split() if isinstance(ngram, str) else ngram
+        return self.log_p_raw(self._replace_unks(words))
+
+    def p(self, ngram: Union[str, Tuple[str, ...]]) -> float:
+        return 10 ** self.log_p(ngram)
+
+    def log_s(self, sentence: Union[str, List[str]]) -> float:
+        if isinstance(sentence, str):
+            sentence = sentence.split()
+
+        words = (_SOS,) + self._replace_unks(sentence) + (_EOS,)
+        result = sum(
+            self.log_p_raw(words[max(0, idx - self.order()) : idx])
+            for idx in range(1, len(words) + 1)
+        )
+        return result - self.log_p_raw(words[:1])
+
+    def s(self, sentence: Union[str, List[str]]) -> float:
+        return 10 ** self.log_s(sentence)
+
+
+def load_arpa(arpa_path: str, binary_path: Optional[str] = None) -> NgramLM:
+    """
+    Load an ARPA LM through its binary form in `binary_path`, which defaults
+    to a directory next to the ARPA file. The binary form is made on the first
+    load, and again if the ARPA file changes later. Otherwise the binary form
+    is memory mapped without reading the ARPA file. If the binary form can't
+    be written, the parsed LM is kept in memory instead.
+
+    `arpa_path` can also be the directory of a saved `NgramLM`.
+    """
+    if os.path.isdir(arpa_path):
+        return NgramLM.load(arpa_path)
+
+    if binary_path is None:
+        binary_path = f"{arpa_path}.npy.d"
+
+    marker = os.path.join(binary_path, "vocab_offsets.npy")
+    if not os.path.exists(marker) or os.path.getmtime(marker) < os.path.getmtime(
+        arpa_path
+    ):
+        lm = NgramLM.from_arpa(arpa_path)
+        try:
+            lm.save(binary_path)
+        except OSError:
+            return lm
+
+    return NgramLM.load(binary_path)
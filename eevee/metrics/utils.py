@@ -1,10 +1,15 @@
+import heapq
 import json
-from typing import Tuple, Any
+from typing import Any, Dict, Generic, Hashable, List, Optional, Tuple, TypeVar
 
 import pandas as pd
 from sklearn.metrics import confusion_matrix
 from sklearn.metrics import precision_recall_fscore_support
 
+# Items counted by a `SpaceSaving` summary
+Item = TypeVar("Item", bound=Hashable)
+
+
 def parse_json_input(entity):
 
     if isinstance(entity, str):
@@ -74,3 +79,112 @@ def weighted_avg_dropna(cat_report_df: pd.DataFrame):
     wad_df = pd.DataFrame(wad, index=["weighted average (excluding no_entity)"])
 
     return pd.concat([cat_report_df, wad_df])
+
+
+class SpaceSaving(Generic[Item]):
+    """
+    Space-Saving summary of the most frequent items of a stream (Metwally et
+    al., 2005), kept in memory bounded by `capacity` items.
+
+    Counts are over-estimates of the true counts by at most their error, and
+    every item occurring more than `total / capacity` times is in the summary.
+    Summaries over separate streams can be merged.
+    """
+
+    def __init__(self, capacity: int):
+        if capacity < 1:
+            raise ValueError(f"capacity should be positive, got {capacity}")
+
+        self.capacity = capacity
+        self.counts: Dict[Item, int] = {}
+        self.errors: Dict[Item, int] = {}
+        self.total = 0
+        # Entries go stale once an item's count changes. The sequence number
+        # breaks ties so items themselves are never compared.
+        self._heap: List[Tuple[int, int, Item]] = []
+        self._seq = 0
+
+    def __len__(self) -> int:
+        return len(self.counts)
+
+    def _push(self, item: Item):
+        self._seq += 1
+        heapq.heappush(self._heap, (self.counts[item], self._seq, item))
+
+        if len(self._heap) > 2 * self.capacity + 64:
+            self._rebuild()
+
+    def _rebuild(self):
+        self._heap = []
+        for item, count in self.counts.items():
+            self._seq += 1
+            self._heap.append((count, self._seq, item))
+        heapq.heapify(self._heap)
+
+    def _pop_min(self) -> Tuple[Item, int]:
+        while True:
+            count, _, item = heapq.heappop(self._heap)
+            if self.counts.get(item) == count:
+                return item, count
+
+    def add(self, item: Item, count: int = 1):
+        self.total += count
+
+        if item in self.counts:
+            self.counts[item] += count
+        elif len(self.counts) < self.capacity:
+            self.counts[item] = count
+            self.errors[item] = 0
+        else:
+            # The new item takes over the least frequent one's count
+            evicted, minimum = self._pop_min()
+            del self.counts[evicted]
+            del self.errors[evicted]
+            self.counts[item] = minimum + count
+            self.errors[item] = minimum
+
+        self._push(item)
+
+    def minimum(self) -> int:
+        """
+        Largest count an item outside of the summary can have.
+        """
+        if len(self.counts) < self.capacity:
+            return 0
+
+        return min(self.counts.values())
+
+    def merge(self, other: "SpaceSaving[Item]") -> "SpaceSaving[Item]":
+        """
+        Add the items of `other` into this summary. An item missing from a full
+        summary is taken to have that summary's minimum count as both its count
+        and its error, which keeps the bounds of both summaries.
+        """
+        minimum, other_minimum = self.minimum(), other.minimum()
+        items = list(self.counts) + [it for it in other.counts if it not in self.counts]
+
+        counts = {
+            it: self.counts.get(it, minimum) + other.counts.get(it, other_minimum)
+            for it in items
+        }
+        errors = {
+            it: self.errors.get(it, minimum) + other.errors.get(it, other_minimum)
+            for it in items
+        }
+
+        kept = sorted(items, key=lambda it: -counts[it])[: self.capacity]
+        self.counts = {it: counts[it] for it in kept}
+        self.errors = {it: errors[it] for it in kept}
+        self.total += other.total
+        self._rebuild()
+
+        return self
+
+    def top(self, k: Optional[int] = None) -> List[Tuple[Item, int, int]]:
+        """
+        (item, count, error) of the `k` items with the highest counts, all the
+        items if `k` isn't given. The true count of an item lies between
+        `count - error` and `count`.
+        """
+        items = sorted(self.counts, key=lambda it: -self.counts[it])[:k]
+        return [(it, self.counts[it], self.errors[it]) for it in items]
@@ -4,19 +4,29 @@ processing steps which are advised when calculating the WER,
 such as filtering out common words and standardizing abbreviations.
 """
 
+import atexit
+import hashlib
 import re
+import sqlite3
 import string
+from collections import OrderedDict
 
 try:
     import stanza
+
+    _STANZA_VERSION = stanza.__version__
 except ImportError:
     print(":: stanza not found")
+    _STANZA_VERSION = None
+
+from typing import Callable, Dict, List, Mapping, Optional, Tuple, Union
 
-from typing import List, Mapping, Union
+import pandas as pd
 
 __all__ = [
     "AbstractTransform",
     "Compose",
+    "FusedTransform",
     "ExpandCommonEnglishContractions",
     "SentencesToListOfWords",
     "RemoveEmptyStrings",
@@ -31,18 +41,34 @@ __all__ = [
     "ToLowerCase",
     "ToUpperCase",
     "Lemmatize",
+    "LemmaCache",
+    "get_lemmatizer",
+    "get_stanza_pipeline",
 ]
 
+_MULTIPLE_SPACES_PATTERN = re.compile(r"\s\s+")
+_KALDI_NON_WORDS_PATTERN = re.compile(r"[<\[][^>\]]*[>\]]")
+
+# Loaded stanza pipelines and shared lemmatizers, one per process
+_STANZA_PIPELINES: Dict[Tuple[str, str], "stanza.Pipeline"] = {}
+_LEMMATIZERS: Dict[str, "Lemmatize"] = {}
+
 
 class AbstractTransform(object):
-    def __call__(self, sentences: Union[str, List[str]]):
+    # Whether `process_list` applies `process_string` on each item. Adjacent
+    # elementwise transforms can be fused by `Compose.compile`.
+    elementwise = True
+
+    def __call__(self, sentences: Union[str, List[str], pd.Series]):
         if isinstance(sentences, str):
             return self.process_string(sentences)
         elif isinstance(sentences, list):
             return self.process_list(sentences)
+        elif isinstance(sentences, pd.Series):
+            return self.process_series(sentences)
         else:
             raise ValueError(
-                "input {} was expected to be a string or list of strings".format(
+                "input {} was expected to be a string, list of strings or a series".format(
                     sentences
                 )
             )
@@ -53,6 +79,49 @@ class AbstractTransform(object):
     def process_list(self, inp: List[str]):
         return [self.process_string(s) for s in inp]
 
+    def process_series(self, series: pd.Series) -> pd.Series:
+        """
+        Transform a whole series, each item being a string or a list of
+        strings. Transforms override this with vectorized `.str` operations
+        where possible, see `_is_string_series`.
+        """
+        return series.map(self)
+
+    def compile(self) -> Callable[[str], str]:
+        """
+        Return a function equivalent to `process_string`. Transforms override
+        this when they have a cheaper direct form.
+        """
+        return self.process_string
+
+
+def _is_string_series(series: pd.Series) -> bool:
+    """
+    Whether all the items of `series` are strings, so `.str` methods apply.
+    """
+    return pd.api.types.infer_dtype(series, skipna=False) in ["string", "empty"]
+
+
+class FusedTransform(AbstractTransform):
+    def __init__(self, transforms: List[AbstractTransform]):
+        """
+        Runs a chain of elementwise transforms as a single string function.
+        """
+        self.transforms = transforms
+        self.functions = [t.compile() for t in transforms]
+
+    def process_string(self, s: str):
+        for fn in self.functions:
+            s = fn(s)
+
+        return s
+
+    def process_series(self, series: pd.Series) -> pd.Series:
+        for t in self.transforms:
+            series = t.process_series(series)
+
+        return series
+
 
 class Compose(object):
     def __init__(self, transforms: List[AbstractTransform]):
@@ -64,6 +133,42 @@ class Compose(object):
 
         return text
 
+    def compile(self) -> "Compose":
+        """
+        Return an equivalent `Compose` where nested compositions are inlined
+        and runs of adjacent elementwise transforms are fused into one
+        `FusedTransform`.
+        """
+        stages: List[AbstractTransform] = []
+        run: List[AbstractTransform] = []
+
+        for tr in self._flatten():
+            if tr.elementwise:
+                run.append(tr)
+                continue
+
+            if run:
+                stages.append(FusedTransform(run))
+                run = []
+            stages.append(tr)
+
+        if run:
+            stages.append(FusedTransform(run))
+
+        return Compose(stages)
+
+    def _flatten(self) -> List[AbstractTransform]:
+        transforms = []
+        for tr in self.transforms:
+            if isinstance(tr, Compose):
+                transforms.extend(tr._flatten())
+            elif isinstance(tr, FusedTransform):
+                transforms.extend(tr.transforms)
+            else:
+                transforms.append(tr)
+
+        return transforms
+
 
 class BaseRemoveTransform(AbstractTransform):
     def __init__(self, tokens_to_remove: List[str], replace_token=""):
@@ -79,8 +184,41 @@ class BaseRemoveTransform(AbstractTransform):
     def process_list(self, inp: List[str]):
         return [self.process_string(s) for s in inp]
 
+    def _translate_table(self) -> Optional[Dict[int, str]]:
+        # Single character tokens can be replaced in one `str.translate` pass,
+        # unless a replacement would be replaced again by a later token.
+        tokens = self.tokens_to_remove
+        if all(len(w) == 1 for w in tokens) and not any(
+            c in tokens[1:] for c in self.replace_token
+        ):
+            return str.maketrans(dict.fromkeys(tokens, self.replace_token))
+
+        return None
+
+    def compile(self) -> Callable[[str], str]:
+        table = self._translate_table()
+        if table is not None:
+            return lambda s: s.translate(table)
+
+        return self.process_string
+
+    def process_series(self, series: pd.Series) -> pd.Series:
+        if not _is_string_series(series):
+            return series.map(self)
+
+        table = self._translate_table()
+        if table is not None:
+            return series.str.translate(table)
+
+        for w in self.tokens_to_remove:
+            series = series.str.replace(w, self.replace_token, regex=False)
+
+        return series
+
 
 class SentencesToListOfWords(AbstractTransform):
+    elementwise = False
+
     def __init__(self, word_delimiter: str = " "):
         """
         Transforms one or more sentences into a list of words. A sentence is
@@ -102,6 +240,13 @@ class SentencesToListOfWords(AbstractTransform):
 
         return words
 
+    def process_series(self, series: pd.Series) -> pd.Series:
+        # Multi character patterns may be read as regexes by `.str.split`
+        if _is_string_series(series) and len(self.word_delimiter) == 1:
+            return series.str.split(self.word_delimiter)
+
+        return series.map(self)
+
 
 class RemoveSpecificWords(BaseRemoveTransform):
     def __init__(self, words_to_remove: List[str]):
@@ -129,18 +274,38 @@ class RemovePunctuation(BaseRemoveTransform):
 
 class RemoveMultipleSpaces(AbstractTransform):
     def process_string(self, s: str):
-        return re.sub(r"\s\s+", " ", s)
+        return _MULTIPLE_SPACES_PATTERN.sub(" ", s)
 
     def process_list(self, inp: List[str]):
         return [self.process_string(s) for s in inp]
 
+    def compile(self) -> Callable[[str], str]:
+        return lambda s: _MULTIPLE_SPACES_PATTERN.sub(" ", s)
+
+    def process_series(self, series: pd.Series) -> pd.Series:
+        if _is_string_series(series):
+            return series.str.replace(_MULTIPLE_SPACES_PATTERN, " ", regex=True)
+
+        return series.map(self)
+
 
 class Strip(AbstractTransform):
     def process_string(self, s: str):
         return s.strip()
 
+    def compile(self) -> Callable[[str], str]:
+        return str.strip
+
+    def process_series(self, series: pd.Series) -> pd.Series:
+        if _is_string_series(series):
+            return series.str.strip()
+
+        return series.map(self)
+
 
 class RemoveEmptyStrings(AbstractTransform):
+    elementwise = False
+
     def process_string(self, s: str):
         return s.strip()
 
@@ -149,81 +314,377 @@ class RemoveEmptyStrings(AbstractTransform):
 
 
 class ExpandCommonEnglishContractions(AbstractTransform):
+    # definitely a non exhaustive list
+
+    # specific words
+    specific = {"won't": "will not", "can't": "can not", "let's": "let us"}
+
+    # general attachments
+    general = {
+        "n't": " not",
+        "'re": " are",
+        "'s": " is",
+        "'d": " would",
+        "'ll": " will",
+        "'t": " not",
+        "'ve": " have",
+        "'m": " am",
+    }
+
+    # Each group is a single alternation. No expansion contains an apostrophe,
+    # so one pass per group gives the same output as one pass per contraction.
+    specific_pattern = re.compile("|".join(map(re.escape, specific)))
+    general_pattern = re.compile("|".join(map(re.escape, general)))
+
     def process_string(self, s: str):
-        # definitely a non exhaustive list
-
-        # specific words
-        s = re.sub(r"won't", "will not", s)
-        s = re.sub(r"can\'t", "can not", s)
-        s = re.sub(r"let\'s", "let us", s)
-
-        # general attachments
-        s = re.sub(r"n\'t", " not", s)
-        s = re.sub(r"\'re", " are", s)
-        s = re.sub(r"\'s", " is", s)
-        s = re.sub(r"\'d", " would", s)
-        s = re.sub(r"\'ll", " will", s)
-        s = re.sub(r"\'t", " not", s)
-        s = re.sub(r"\'ve", " have", s)
-        s = re.sub(r"\'m", " am", s)
+        s = self.specific_pattern.sub(lambda m: self.specific[m.group()], s)
+        s = self.general_pattern.sub(lambda m: self.general[m.group()], s)
 
         return s
 
+    def process_series(self, series: pd.Series) -> pd.Series:
+        if not _is_string_series(series):
+            return series.map(self)
+
+        series = series.str.replace(
+            self.specific_pattern, lambda m: self.specific[m.group()], regex=True
+        )
+        return series.str.replace(
+            self.general_pattern, lambda m: self.general[m.group()], regex=True
+        )
+
 
 class SubstituteWords(AbstractTransform):
     def __init__(self, substitutions: Mapping[str, str]):
         self.substitutions = substitutions
+        self.patterns = [
+            (re.compile(r"\b{}\b".format(re.escape(key))), value)
+            for key, value in substitutions.items()
+        ]
+        self.pattern = self._merged_pattern()
+
+    def _merged_pattern(self) -> Optional["re.Pattern"]:
+        """
+        A single alternation over all the keys, when it is equivalent to
+        substituting the keys one after the other. That is the case if the
+        keys are plain words, and no value is a template or brings in a key.
+        """
+        if not self.substitutions:
+            return None
+
+        if not all(re.fullmatch(r"\w+", key) for key in self.substitutions):
+            return None
+
+        pattern = re.compile(
+            r"\b(?:{})\b".format("|".join(map(re.escape, self.substitutions)))
+        )
+        for value in self.substitutions.values():
+            if "\\" in value or pattern.search(value):
+                return None
+
+        return pattern
 
     def process_string(self, s: str):
-        for key, value in self.substitutions.items():
-            s = re.sub(r"\b{}\b".format(re.escape(key)), value, s)
+        if self.pattern is not None:
+            return self.pattern.sub(lambda m: self.substitutions[m.group()], s)
+
+        for pattern, value in self.patterns:
+            s = pattern.sub(value, s)
 
         return s
 
+    def process_series(self, series: pd.Series) -> pd.Series:
+        if not _is_string_series(series):
+            return series.map(self)
+
+        if self.pattern is not None:
+            return series.str.replace(
+                self.pattern, lambda m: self.substitutions[m.group()], regex=True
+            )
+
+        for pattern, value in self.patterns:
+            series = series.str.replace(pattern, value, regex=True)
+
+        return series
+
 
 class SubstituteRegexes(AbstractTransform):
     def __init__(self, substitutions: Mapping[str, str]):
         self.substitutions = substitutions
+        self.patterns = [
+            (re.compile(key), value) for key, value in substitutions.items()
+        ]
 
     def process_string(self, s: str):
-        for key, value in self.substitutions.items():
-            s = re.sub(key, value, s)
+        for pattern, value in self.patterns:
+            s = pattern.sub(value, s)
 
         return s
 
+    def process_series(self, series: pd.Series) -> pd.Series:
+        if not _is_string_series(series):
+            return series.map(self)
+
+        for pattern, value in self.patterns:
+            series = series.str.replace(pattern, value, regex=True)
+
+        return series
+
 
 class ToLowerCase(AbstractTransform):
     def process_string(self, s: str):
         return s.lower()
 
+    def compile(self) -> Callable[[str], str]:
+        return str.lower
+
+    def process_series(self, series: pd.Series) -> pd.Series:
+        if _is_string_series(series):
+            return series.str.lower()
+
+        return series.map(self)
+
 
 class ToUpperCase(AbstractTransform):
     def process_string(self, s: str):
         return s.upper()
 
+    def compile(self) -> Callable[[str], str]:
+        return str.upper
+
+    def process_series(self, series: pd.Series) -> pd.Series:
+        if _is_string_series(series):
+            return series.str.upper()
+
+        return series.map(self)
+
 
 class RemoveKaldiNonWords(AbstractTransform):
     def process_string(self, s: str):
-        return re.sub(r"[<\[][^>\]]*[>\]]", "", s)
+        return _KALDI_NON_WORDS_PATTERN.sub("", s)
 
+    def compile(self) -> Callable[[str], str]:
+        return lambda s: _KALDI_NON_WORDS_PATTERN.sub("", s)
 
-class Lemmatize(AbstractTransform):
-    def __init__(self, lang="en") -> None:
+    def process_series(self, series: pd.Series) -> pd.Series:
+        if _is_string_series(series):
+            return series.str.replace(_KALDI_NON_WORDS_PATTERN, "", regex=True)
+
+        return series.map(self)
+
+
+def get_stanza_pipeline(lang: str = "en", processors: str = "tokenize, lemma"):
+    """
+    Return the stanza pipeline for `lang` and `processors`. Each pipeline is
+    loaded only once per process and reused afterwards.
+    """
+    key = (lang, processors)
+    if key not in _STANZA_PIPELINES:
         try:
-            self.nlp = stanza.Pipeline(
-                lang=lang, processors="tokenize, lemma", verbose=False, use_gpu=False
+            nlp = stanza.Pipeline(
+                lang=lang, processors=processors, verbose=False, use_gpu=False
             )
         except FileNotFoundError:
             stanza.download(lang)
-            self.nlp = stanza.Pipeline(
-                lang=lang, processors="tokenize, lemma", verbose=False, use_gpu=False
+            nlp = stanza.Pipeline(
+                lang=lang, processors=processors, verbose=False, use_gpu=False
             )
+        _STANZA_PIPELINES[key] = nlp
 
-    def process_string(self, s: str):
+    return _STANZA_PIPELINES[key]
+
+
+def get_lemmatizer(lang: str = "en", cache: "LemmaCache" = None) -> "Lemmatize":
+    """
+    Return a `Lemmatize` transform for `lang` shared across the process, so
+    lemmas computed in a batch are visible to all later calls. If `cache` is
+    given, it replaces the cache of the shared transform.
+    """
+    if lang not in _LEMMATIZERS:
+        _LEMMATIZERS[lang] = Lemmatize(lang=lang, cache=cache)
+    elif cache is not None:
+        _LEMMATIZERS[lang].cache = cache
+
+    return _LEMMATIZERS[lang]
+
+
+class LemmaCache(object):
+    def __init__(
+        self, path: str = None, max_size: int = 100000, commit_size: int = 1000
+    ):
+        """
+        Cache of lemmatized sentences, keyed by language, pipeline processors,
+        stanza version and a hash of the sentence.
+
+        Lookups go through an in-memory LRU of `max_size` entries. If `path`
+        is given, entries are also persisted in a SQLite file there, so repeat
+        runs over the same sentences skip stanza. New entries are written in
+        one transaction once `commit_size` of them are pending, and on
+        `flush` or `close`, which also runs at interpreter exit.
+        :param path: path of the SQLite file. The cache is memory only if not given.
+        :param max_size: maximum number of entries kept in memory
+        :param commit_size: number of new entries written to SQLite together
+        """
+        self.path = path
+        self.max_size = max_size
+        self.commit_size = commit_size
+        self.memory: "OrderedDict[str, str]" = OrderedDict()
+        self.pending: Dict[str, str] = {}
+        self.hits = 0
+        self.misses = 0
+
+        self.db = None
+        if path:
+            self.db = sqlite3.connect(path)
+            self.db.execute(
+                "CREATE TABLE IF NOT EXISTS lemmas (key TEXT PRIMARY KEY, lemmas TEXT NOT NULL)"
+            )
+            self.db.commit()
+            atexit.register(self.close)
+
+    @staticmethod
+    def key(lang: str, processors: str, sentence: str) -> str:
+        digest = hashlib.sha1(sentence.encode("utf-8")).hexdigest()
+        return f"{lang}|{processors}|{_STANZA_VERSION}|{digest}"
 
-        doc = self.nlp(s)
+    def _remember(self, key: str, lemmas: str):
+        self.memory[key] = lemmas
+        self.memory.move_to_end(key)
+        if len(self.memory) > self.max_size:
+            self.memory.popitem(last=False)
+
+    def get(self, key: str) -> Optional[str]:
+        try:
+            lemmas = self.memory[key]
+            self.memory.move_to_end(key)
+            self.hits += 1
+            return lemmas
+        except KeyError:
+            pass
+
+        # Entries evicted from memory before they were written
+        if key in self.pending:
+            self._remember(key, self.pending[key])
+            self.hits += 1
+            return self.pending[key]
+
+        if self.db is not None:
+            row = self.db.execute(
+                "SELECT lemmas FROM lemmas WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None:
+                self._remember(key, row[0])
+                self.hits += 1
+                return row[0]
+
+        self.misses += 1
+        return None
+
+    def put_many(self, items: List[Tuple[str, str]]):
+        """
+        Add (key, lemmas) items. They are persisted with the next write of
+        pending entries.
+        """
+        for key, lemmas in items:
+            self._remember(key, lemmas)
+
+        if self.db is not None:
+            self.pending.update(items)
+            if len(self.pending) >= self.commit_size:
+                self.flush()
+
+    def put(self, key: str, lemmas: str):
+        self.put_many([(key, lemmas)])
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "size": len(self.memory),
+        }
+
+    def flush(self):
+        """
+        Write the pending entries to SQLite in one transaction.
+        """
+        if self.db is not None and self.pending:
+            self.db.executemany(
+                "INSERT OR REPLACE INTO lemmas (key, lemmas) VALUES (?, ?)",
+                list(self.pending.items()),
+            )
+            self.db.commit()
+        self.pending.clear()
+
+    def close(self):
+        if self.db is not None:
+            self.flush()
+            self.db.close()
+            self.db = None
+            # Nothing left to do at exit, and the cache can be freed
+            atexit.unregister(self.close)
+
+
+class Lemmatize(AbstractTransform):
+    elementwise = False
 
+    def __init__(
+        self, lang="en", processors="tokenize, lemma", cache: LemmaCache = None
+    ) -> None:
+        """
+        Lemmatize sentences with stanza. The pipeline comes from the process
+        wide registry in `get_stanza_pipeline`.
+
+        Lemmatized sentences are looked up in and added to `cache`. A memory
+        only `LemmaCache` is used if not given.
+        """
+        self.lang = lang
+        self.processors = processors
+        self.nlp = get_stanza_pipeline(lang, processors)
+        self.cache = LemmaCache() if cache is None else cache
+
+    @staticmethod
+    def _join_lemmas(doc) -> str:
         return " ".join([word.lemma for sent in doc.sentences for word in sent.words])
 
+    def _key(self, s: str) -> str:
+        return LemmaCache.key(self.lang, self.processors, s)
+
+    def process_string(self, s: str):
+        key = self._key(s)
+        lemmas = self.cache.get(key)
+
+        if lemmas is None:
+            doc = self.nlp(s)
+            lemmas = self._join_lemmas(doc)
+            self.cache.put(key, lemmas)
+
+        return lemmas
+
+    def process_batch(self, sentences: List[str]) -> List[str]:
+        """
+        Lemmatize many sentences, running a single stanza call over the ones
+        missing from the cache.
+        """
+        results = {}
+        pending = []
+        for s in dict.fromkeys(sentences):
+            lemmas = self.cache.get(self._key(s))
+            if lemmas is None:
+                pending.append(s)
+            else:
+                results[s] = lemmas
+
+        if pending:
+            docs = self.nlp([stanza.Document([], text=s) for s in pending])
+            computed = [self._join_lemmas(doc) for doc in docs]
+            self.cache.put_many(
+                [(self._key(s), lemmas) for s, lemmas in zip(pending, computed)]
+            )
+            results.update(zip(pending, computed))
+
+        return [results[s] for s in sentences]
+
     def process_list(self, inp: List[str]):
         return [s for s in inp if self.process_string(s) != ""]
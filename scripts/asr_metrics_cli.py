@@ -2,17 +2,23 @@
 Command line interface to get ASR metrics
 
 Usage:
-asr_metrics_cli.py --lang=<lang> --transcripts=<transcripts> --out=<out> [--stop-path=stop-path] [--lexicon=lexicon] [--alignments=alignments] [--phone-post=phone-post] [--lm=lm] 
+asr_metrics_cli.py --lang=<lang> --transcripts=<transcripts> --out=<out> [--stop-path=stop-path] [--lexicon=lexicon] [--alignments=alignments] [--phone-post=phone-post] [--lm=lm] [--lm-cache=lm-cache] [--lemmatize] [--lemma-cache=lemma-cache] [--workers=<workers>]
 
 Options:
 --lang=<lang>               Language of transcriptions
 --transcripts=<transcripts> Input file path. File should contain list of jsons
 --out=<out>                 Output file path
 --stop-path=<stop-path>       Stop word file path 
---lexicon=<lexicon>           Lexicon file path 
+--lexicon=<lexicon>           Lexicon file path, or directory of a saved LexiconIndex
 --alignments=<alignments>     NNet3/Chain alignments from Kaldi
 --phone-post=<phone-post>     Phone posteriors fomr Kaldi
---lm=<lm>                     Language Model. Should be arpa format
+--lm=<lm>                     Language Model. Should be arpa format, it is memory mapped
+                              from a binary form made next to it on the first run
+--lm-cache=<lm-cache>         Directory to keep the binary form of the LM in, instead
+                              of next to the arpa file
+--lemmatize                   Also report metrics on lemmatized text
+--lemma-cache=<lemma-cache>   SQLite file to persist lemmas across runs
+--workers=<workers>           Number of processes to score transcripts with [default: 1]
 
 """
 
@@ -21,15 +27,14 @@ import sqlite3
 
 from docopt import docopt
 from tqdm import tqdm
-import arpa
 import pandas as pd
 
-from eevee.asr_metrics import get_metrics, parse_phone_posterior, parse_alignments
+from eevee.asr_metrics import MetricsContext, parse_phone_posterior, parse_alignments
+from eevee.metrics.lm import load_arpa
+from eevee.transforms import LemmaCache, get_lemmatizer
 
 
 def main():
-    tqdm.pandas()
-
     def get_phone_posts(uuid):
         try:
             return post[uuid]
@@ -54,6 +59,10 @@ def main():
     alignments = args["--alignments"]
     phone_post = args["--phone-post"]
     lm = args["--lm"]
+    lm_cache = args["--lm-cache"]
+    lemmatize = args["--lemmatize"]
+    lemma_cache = args["--lemma-cache"]
+    workers = int(args["--workers"])
 
     if transcripts.endswith(".sqlite"):
         with sqlite3.connect(transcripts) as db:
@@ -68,26 +77,6 @@ def main():
         df["uuid"] = df["uuid"]
         df.rename(columns={"gasr_output_alternatives": "alternatives"}, inplace=True)
 
-    if stop_path:
-        with open(stop_path) as fin:
-            remove_words = fin.read().split("\n")
-    else:
-        remove_words = None
-
-    # parse lexicon file
-    if lexicon:
-        with open(lexicon) as fin:
-            lex = fin.read().split("\n")
-        lexicon = {}
-        for word in lex:
-            try:
-                lexicon[word.split(" ", 1)[0]] = word.split(" ", 1)[0]
-            except IndexError:
-                pass
-
-    else:
-        lexicon = None
-
     if alignments and phone_post:
         with open(phone_post) as fin:
             post = fin.read().split("\n")
@@ -106,28 +95,38 @@ def main():
         df["alignment"] = None
 
     if lm:
-        lm = arpa.loadf(lm)[0]
+        lm = load_arpa(lm, binary_path=lm_cache)
     else:
         lm = None
 
-    df["results"] = df.progress_apply(
-        lambda x: json.dumps(
-            get_metrics(
-                ref=json.loads(x["transcription"])["text"],
-                hyp=x["alternatives"],
-                lang=lang,
-                lexicon=lexicon,
-                lm=lm,
-                alignment=x["alignment"],
-                phone_post=x["phone_post"],
-                remove_words=remove_words,
-            )
-        ),
-        axis=1,
+    if lemmatize and lemma_cache:
+        get_lemmatizer(lang, cache=LemmaCache(lemma_cache))
+
+    # Stop words and lexicon are read once for all transcripts
+    context = MetricsContext(
+        lang=lang,
+        remove_words=stop_path,
+        lexicon=lexicon,
+        lm=lm,
+        lemmatize=lemmatize,
     )
+    records = zip(
+        df["transcription"].map(lambda x: json.loads(x)["text"]),
+        df["alternatives"],
+        df["alignment"],
+        df["phone_post"],
+    )
+    df["results"] = [
+        json.dumps(results)
+        for results in tqdm(context.imap(records, workers=workers), total=len(df))
+    ]
 
     df.to_csv(out_path, index=False)
 
+    if lemmatize:
+        print(get_lemmatizer(lang).cache.stats())
+        get_lemmatizer(lang).cache.close()
+
 
 if __name__ == "__main__":
     main()
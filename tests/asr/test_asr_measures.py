@@ -0,0 +1,259 @@
+import sys
+
+import numpy as np
+import pytest
+from eevee.metrics.asr import (
+    Alignment,
+    AlignmentMemo,
+    Vocabulary,
+    compute_asr_measures,
+    compute_asr_measures_batch,
+    compute_asr_measures_nbest,
+)
+from eevee.metrics.lexicon import LexiconIndex
+from eevee.metrics.lm import NgramLM, PerplexityScorer, load_arpa
+
+
+PAIRS = [
+    ("", ""),
+    ("a", "b"),
+    ("a b", "b"),
+    ("hello world", ""),
+    ("", "hello"),
+    ("i want to  book a ticket", "i want book the ticket please"),
+    ("Yes", "yes yes <unk>"),
+]
+
+
+def test_batch_matches_per_pair():
+    truths, hypotheses = zip(*PAIRS)
+    batch = compute_asr_measures_batch(truths, hypotheses)
+
+    for idx, (truth, hypothesis) in enumerate(PAIRS):
+        measures = compute_asr_measures(truth, hypothesis)
+        for name, values in batch.items():
+            assert values[idx] == measures[name], (name, truth, hypothesis)
+
+
+def test_batch_length_mismatch():
+    with pytest.raises(ValueError):
+        compute_asr_measures_batch(["a"], ["a", "b"])
+
+
+def test_vocabulary_round_trip(tmp_path):
+    vocabulary = Vocabulary.from_corpus(["Hello world", "", "hello there"])
+    assert vocabulary.id2word == ["hello", "world", "there"]
+
+    path = tmp_path / "vocab.json"
+    vocabulary.save(path)
+    assert Vocabulary.load(path).word2id == vocabulary.word2id
+
+
+def test_vocabulary_beyond_code_points():
+    vocabulary = Vocabulary()
+    vocabulary.id2word = [""] * (sys.maxunicode + 1)
+
+    measures = compute_asr_measures("a b c", "a c d", vocabulary=vocabulary)
+    assert measures == compute_asr_measures("a b c", "a c d")
+    assert vocabulary.word2id["a"] == sys.maxunicode + 1
+
+
+def test_alignment_measures():
+    alignment = Alignment.from_pair("i want to book a ticket", "i want book the ticket")
+
+    assert alignment.counts == (4, 1, 1, 0)
+    assert alignment.wer == 2 / 6
+    assert alignment.mer == 2 / 6
+    assert alignment.wil == 1 - (4 / 6) * (4 / 5)
+
+
+def test_metric_selection():
+    measures = compute_asr_measures("a b c", "a c d", metrics=["mer", "wer"])
+    assert list(measures) == ["wer", "mer"]
+    assert measures["wer"] == compute_asr_measures("a b c", "a c d")["wer"]
+
+    batch = compute_asr_measures_batch(["a b c"], ["a c d"], metrics=["wer"])
+    assert list(batch) == ["wer"]
+
+    with pytest.raises(ValueError):
+        compute_asr_measures("a", "a", metrics=["bleu"])
+
+
+def test_alignment_memo():
+    memo = AlignmentMemo(max_size=2)
+
+    first = memo.align(["yes"], ["yes"])
+    assert memo.align(["yes"], ["yes"]) is first
+
+    memo.align(["no"], ["yes"])
+    memo.align(["haan"], ["haan"])
+
+    assert (("yes",), ("yes",)) not in memo.memory
+    assert memo.stats() == {"hits": 1, "misses": 3, "hit_rate": 0.25, "size": 2}
+
+
+def test_batch_with_memo():
+    truths, hypotheses = zip(*(PAIRS[1:] * 3))
+    memo = AlignmentMemo()
+
+    expected = compute_asr_measures_batch(truths, hypotheses)
+    memoized = compute_asr_measures_batch(truths, hypotheses, memo=memo)
+
+    for name, values in expected.items():
+        assert memoized[name].tolist() == values.tolist()
+    assert memo.hits == 2 * len(PAIRS[1:])
+
+
+def test_nbest_matches_pairs():
+    truth = "i want to  book a ticket"
+    hypotheses = [hypothesis for _, hypothesis in PAIRS]
+
+    nbest = compute_asr_measures_nbest(truth, hypotheses)
+
+    assert nbest == [compute_asr_measures(truth, hypothesis) for hypothesis in hypotheses]
+    assert compute_asr_measures_nbest(truth, []) == []
+
+
+def test_lexicon_index(tmp_path):
+    lexicon = {"book": "b uh k", "a": "ah", "ticket": "t ih k ah t", "the": "dh ah"}
+    index = LexiconIndex.from_dict(lexicon)
+    index.save(str(tmp_path))
+    mapped = LexiconIndex.load(str(tmp_path))
+
+    assert dict(mapped) == lexicon
+    assert "packet" not in mapped
+    assert mapped.count_oov(["book", "a", "packet", "ticket", "now"]) == 2
+    assert mapped.phones(["book", "now", "a"]).tobytes().decode("utf-32-le") == "b uh k ah"
+
+    for truth, hypothesis in [
+        ("book a ticket", "book the packet"),
+        ("book a ticket now", "look a ticket"),
+        ("now", "book"),
+    ]:
+        assert compute_asr_measures(
+            truth, hypothesis, lexicon=mapped
+        ) == compute_asr_measures(truth, hypothesis, lexicon=lexicon)
+
+
+class BigramLM:
+    """
+    Tiny backoff bigram LM with the interface of `arpa` models.
+    """
+
+    def __init__(self):
+        self.calls = 0
+        self.probs = {
+            ("<s>",): -99.0,
+            ("</s>",): -1.0,
+            ("book",): -1.2,
+            ("a",): -0.8,
+            ("ticket",): -1.5,
+            ("<s>", "book"): -0.3,
+            ("book", "a"): -0.2,
+            ("a", "ticket"): -0.4,
+            ("ticket", "</s>"): -0.1,
+        }
+        self.backoffs = {("<s>",): -0.5, ("book",): -0.3, ("a",): -0.2}
+
+    def vocabulary(self):
+        return sorted({word for ngram in self.probs for word in ngram})
+
+    def counts(self):
+        return [(1, 5), (2, 4)]
+
+    def log_p_raw(self, ngram):
+        self.calls += 1
+        try:
+            return self.probs[ngram]
+        except KeyError:
+            if len(ngram) == 1:
+                raise
+            return self.backoffs.get(ngram[:-1], 0) + self.log_p_raw(ngram[1:])
+
+    def p(self, word):
+        return 10 ** self.log_p_raw((word,))
+
+    def s(self, sentence):
+        words = ("<s>",) + tuple(sentence.split()) + ("</s>",)
+        log_s = sum(self.log_p_raw(words[:idx]) for idx in range(1, len(words) + 1))
+        return 10 ** (log_s - self.log_p_raw(words[:1]))
+
+
+def test_perplexity_scorer():
+    lm = BigramLM()
+    vocabulary = lm.vocabulary()
+
+    def reference_ppl(sent):
+        sent = [x for x in sent.split() if x in vocabulary]
+        if len(sent) > 1:
+            return (1 / lm.s(" ".join(sent))) ** (1 / len(sent))
+        return (1 / lm.p(sent[0])) ** (1 / len(sent))
+
+    sentences = ["book a ticket", "book the ticket", "a", "ticket book a ticket"]
+    expected = [reference_ppl(sent) for sent in sentences]
+
+    scorer = PerplexityScorer(lm)
+    assert scorer.perplexities(sentences) == expected
+    assert scorer.perplexity(sentences[0].split()) == expected[0]
+    assert scorer.perplexity("the") == 5
+
+    # Repeated sentences are scored from memoized n-grams
+    calls = lm.calls
+    scorer.perplexities(sentences)
+    assert lm.calls == calls
+
+    measures = compute_asr_measures("book a ticket", "book the ticket", lm=lm)
+    assert measures["ppl"] == expected[1]
+
+
+def test_ngram_lm(tmp_path):
+    reference = BigramLM()
+
+    arpa_path = tmp_path / "lm.arpa"
+    lines = ["", "\\data\\", "ngram 1=5", "ngram 2=4"]
+    for order in [1, 2]:
+        lines.extend(["", f"\\{order}-grams:"])
+        for ngram, log_prob in reference.probs.items():
+            if len(ngram) == order:
+                backoff = reference.backoffs.get(ngram)
+                fields = [str(log_prob), " ".join(ngram)]
+                lines.append("\t".join(fields + ([str(backoff)] if backoff else [])))
+    lines.extend(["", "\\end\\", ""])
+    arpa_path.write_text("\n".join(lines))
+
+    lm = load_arpa(str(arpa_path))
+    assert isinstance(lm.keys[0], np.memmap)
+    assert lm.counts() == reference.counts()
+    assert lm.vocabulary() == set(reference.vocabulary())
+
+    # Later loads map the binary form made by the first one
+    assert load_arpa(str(arpa_path)).counts() == lm.counts()
+
+    # The LM is kept in memory where its binary form can't be written
+    in_memory = load_arpa(str(arpa_path), binary_path=str(arpa_path / "cache"))
+    assert not isinstance(in_memory.keys[0], np.memmap)
+    assert in_memory.counts() == lm.counts()
+
+    for sent in ["book a ticket", "book the ticket", "a", "ticket book a ticket"]:
+        assert PerplexityScorer(lm).perplexity(sent) == pytest.approx(
+            PerplexityScorer(reference).perplexity(sent), rel=1e-5
+        )
+
+    # A lower order LM saved over a higher order one loads only its orders
+    saved_path = str(tmp_path / "saved")
+    lm.save(saved_path)
+    unigram_lm = NgramLM(
+        lm.vocab_offsets, lm.vocab_bytes, lm.keys[:1], lm.log_probs[:1], lm.backoffs[:1]
+    )
+    unigram_lm.save(saved_path)
+    assert NgramLM.load(saved_path).counts() == lm.counts()[:1]
+
+
+def test_default_measures():
+    measures = compute_asr_measures("book a ticket", "book the ticket")
+
+    assert "cer" in measures
+    assert not [name for name in measures if name.startswith("char_")]
+    assert "char_hits" in compute_asr_measures(
+        "book a ticket", "book the ticket", metrics=["char_hits"]
+    )
@@ -0,0 +1,58 @@
+import eevee.transforms as tr
+import pytest
+from eevee.asr_metrics import _prefetch_lemmas, get_metrics, get_metrics_batch
+from eevee.metrics import compute_asr_measures_nbest
+
+
+def test_get_metrics_batch(tmp_path):
+    remove_words = tmp_path / "stop.txt"
+    remove_words.write_text("a\nthe")
+    lexicon = tmp_path / "lexicon.txt"
+    lexicon.write_text("book b uh k\nticket t ih k ah t\na ah")
+
+    records = [
+        ("book a <noise> ticket", "book the ticket", None, None),
+        ("book a ticket", ["book ticket", "look a ticket"], None, None),
+    ] * 4
+    expected = [
+        get_metrics(
+            ref,
+            hyp,
+            lang="en",
+            remove_words=str(remove_words),
+            lexicon=str(lexicon),
+        )
+        for ref, hyp, _, _ in records
+    ]
+
+    for workers in [1, 2]:
+        given = get_metrics_batch(
+            records,
+            lang="en",
+            remove_words=str(remove_words),
+            lexicon=str(lexicon),
+            workers=workers,
+        )
+        assert given == expected
+
+
+@pytest.mark.parametrize("remove_words", [None, ["a", "the"]])
+def test_prefetch_lemmas(fake_stanza, remove_words):
+    ref = "book a tickets"
+    hyps = ["books the ticket", "look a tickets", "books the ticket"]
+
+    _prefetch_lemmas(ref, hyps, "en", remove_words)
+    nlp = tr.get_stanza_pipeline("en")
+    assert len(nlp.calls) == 1
+
+    kwargs = {"words_to_filter": remove_words} if remove_words else {}
+    measures = compute_asr_measures_nbest(ref, hyps, lemmatize=True, lang="en", **kwargs)
+
+    # All the lemmas were prefetched
+    assert len(nlp.calls) == 1
+    lemmatized = compute_asr_measures_nbest(
+        "book a ticket",
+        ["book the ticket", "look a ticket", "book the ticket"],
+        **kwargs,
+    )
+    assert measures == lemmatized
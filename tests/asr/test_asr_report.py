@@ -1,9 +1,23 @@
-import pandas as pd
-from eevee.metrics.asr import asr_report
+import itertools
+import json
+import sys
+import tracemalloc
+from functools import reduce
+from operator import mul
 
+import pandas as pd
+import pytest
+from eevee.cli import main
+from eevee.metrics.asr import (ASRReportAccumulator, asr_report, asr_report_slices,
+                               asr_report_streaming, corpus_measures,
+                               get_ops, merge_utterances)
 
-def test_asr_report():
 
+@pytest.fixture
+def labels():
+    """
+    True and predicted labels of the sample data.
+    """
     true_df = pd.read_csv(
         "data/tagged.transcriptions.csv", usecols=["id", "transcription"]
     )
@@ -11,6 +25,12 @@ def test_asr_report():
         "data/predicted.transcriptions.csv", usecols=["id", "utterances"]
     )
 
+    return true_df, pred_df
+
+
+def test_asr_report(labels):
+    true_df, pred_df = labels
+
     expected = pd.DataFrame(
         {
             "Metric": [
@@ -22,6 +42,9 @@ def test_asr_report():
                 "Min WER",
                 "Short Utterance WER",
                 "Long Utterance WER",
+                "Corpus WER",
+                "Corpus MER",
+                "Corpus CER",
             ],
             "Value": [
                 0.5714285714285715,
@@ -32,8 +55,11 @@ def test_asr_report():
                 0.5714285714285715,
                 0.000000,
                 0.8095238095238096,
+                0.7142857142857143,
+                0.5555555555555556,
+                0.6792452830188679,
             ],
-            "Support": [6, 2, 4, 6, 6, 6, 1, 3],
+            "Support": [6, 2, 4, 6, 6, 6, 1, 3, 6, 6, 6],
         }
     )
     expected.set_index("Metric", inplace=True)
@@ -41,3 +67,269 @@ def test_asr_report():
     given = asr_report(true_df, pred_df)
 
     assert given.to_dict("records") == expected.to_dict("records")
+
+
+def test_asr_report_workers(labels):
+    true_df, pred_df = labels
+
+    _, serial, _ = asr_report(true_df, pred_df, dump=True)
+    _, parallel, _ = asr_report(true_df, pred_df, dump=True, workers=2)
+
+    assert parallel["all_wer"].tolist() == serial["all_wer"].tolist()
+
+
+def test_corpus_measures_subset(labels):
+    true_df, pred_df = labels
+
+    _, breakdown, _ = asr_report(true_df, pred_df, dump=True)
+    mask = breakdown["length"] > 2
+
+    subset = breakdown[mask]
+    errors = subset[["substitutions", "deletions", "insertions"]].to_numpy().sum()
+    reference = subset[["hits", "substitutions", "deletions"]].to_numpy().sum()
+
+    assert corpus_measures(breakdown, mask)["wer"] == errors / reference
+
+    # Nothing to divide by on an empty subset
+    assert pd.isna(list(corpus_measures(breakdown, mask & False).values())).all()
+    report = ASRReportAccumulator().update(breakdown[:0]).report()
+    assert report.loc[["Corpus WER", "Corpus MER", "Corpus CER"], "Value"].isna().all()
+
+
+def test_asr_report_streaming(labels):
+    true_df, pred_df = labels
+
+    report = asr_report(true_df, pred_df)
+    streamed = asr_report_streaming(
+        "data/tagged.transcriptions.csv",
+        "data/predicted.transcriptions.csv",
+        chunksize=2,
+    )
+
+    pd.testing.assert_frame_equal(streamed, report)
+
+
+def test_asr_report_streaming_memory(tmp_path):
+    n_truths = 20000
+    true_path = tmp_path / "true.csv"
+    pred_path = tmp_path / "pred.csv"
+    pd.DataFrame(
+        {
+            "id": range(n_truths),
+            "transcription": [f"book {i} tickets for {i + 1} people" for i in range(n_truths)],
+        }
+    ).to_csv(true_path, index=False)
+    pd.DataFrame(
+        {
+            "id": [0, 1],
+            "utterances": [
+                json.dumps([[{"transcript": "book tickets", "confidence": None}]])
+            ] * 2,
+        }
+    ).to_csv(pred_path, index=False)
+
+    tracemalloc.start()
+    try:
+        pd.read_csv(true_path, usecols=["id", "transcription"]).set_index("id")
+        index_peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.reset_peak()
+
+        asr_report_streaming(str(true_path), str(pred_path))
+        streaming_peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    # Beyond the truth id index, memory only depends on the predictions read
+    assert streaming_peak < 2 * index_peak
+
+
+def test_asr_report_accumulator_merge(labels):
+    true_df, pred_df = labels
+
+    _, breakdown, _ = asr_report(true_df, pred_df, dump=True)
+    merged = ASRReportAccumulator().update(breakdown[:3])
+    merged.merge(ASRReportAccumulator().update(breakdown[3:]))
+
+    pd.testing.assert_frame_equal(
+        merged.report(), ASRReportAccumulator().update(breakdown).report()
+    )
+
+
+def test_asr_report_memo(labels):
+    true_df, pred_df = labels
+
+    # Every utterance repeated under a new id
+    true_df = pd.concat([true_df, true_df.assign(id=true_df["id"] + 1000)])
+    pred_df = pd.concat([pred_df, pred_df.assign(id=pred_df["id"] + 1000)])
+
+    report = asr_report(true_df, pred_df)
+    memoized = asr_report(true_df, pred_df, memo_size=100)
+
+    assert "Alignment Memo Hit Rate" not in report.index
+    assert memoized.loc["Alignment Memo Hit Rate", "Value"] >= 0.5
+    pd.testing.assert_frame_equal(
+        memoized.drop("Alignment Memo Hit Rate"), report
+    )
+
+
+def test_merge_utterances_order():
+    utterances = [
+        [
+            {"transcript": "book", "confidence": 0.5},
+            {"transcript": "look", "confidence": 0.9},
+            {"transcript": "cook", "confidence": None},
+        ],
+        [
+            {"transcript": "a", "confidence": 0.8},
+            {"transcript": "the", "confidence": 0.8},
+        ],
+        [
+            {"transcript": "ticket", "confidence": 0.7},
+            {"transcript": "table", "confidence": 0.4},
+            {"transcript": "tick", "confidence": 0.6},
+        ],
+    ]
+
+    # Reference ranking over the full cross product
+    expected = sorted(
+        (
+            (
+                sum(idx for idx, _ in tup),
+                {
+                    "transcript": " ".join(alt["transcript"] for _, alt in tup),
+                    "confidence": reduce(mul, [alt["confidence"] or 0 for _, alt in tup]),
+                },
+            )
+            for tup in itertools.product(*[enumerate(utt) for utt in utterances])
+        ),
+        key=lambda it: (it[0], -it[1]["confidence"] or 0),
+    )[:10]
+
+    assert merge_utterances(utterances) == [[alt for _, alt in expected]]
+    assert merge_utterances(utterances[:1]) == utterances[:1]
+    assert merge_utterances([utterances[0], []]) == [[]]
+
+
+def test_asr_report_min_k():
+    true_df = pd.DataFrame(
+        {"id": [1, 2], "transcription": ["book a ticket", "yes please"]}
+    )
+    alternatives = [
+        ["look a packet", "book the ticket", "book a ticket"],
+        ["yes", "yes please"],
+    ]
+    pred_df = pd.DataFrame(
+        {
+            "id": [1, 2],
+            "utterances": [
+                json.dumps([[{"transcript": alt, "confidence": None} for alt in alts]])
+                for alts in alternatives
+            ],
+        }
+    )
+
+    report, breakdown, _ = asr_report(true_df, pred_df, dump=True, min_k=[1, 2, 10])
+
+    for k in [1, 2, 10]:
+        expected = [min(wers[:k]) for wers in breakdown["all_wer"]]
+        assert breakdown[f"min_{k}_wer"].tolist() == expected
+
+    assert report.loc["Min 1 WER", "Value"] == report.loc["WER", "Value"]
+    assert report.loc["Min 2 WER", "Value"] == (1 / 3 + 0) / 2
+    assert report.loc["Min WER", "Value"] == 0
+
+    report = asr_report(true_df, pred_df, min_k=[5, 10, 5])
+    assert list(report.index[4:6]) == ["Min 5 WER", "Min WER"]
+
+    with pytest.raises(ValueError):
+        asr_report(true_df, pred_df, min_k=[5, 10, 12])
+
+
+def test_cli_asr_min_k_json(monkeypatch, capsys):
+    monkeypatch.setattr(
+        sys,
+        "argv",
+        [
+            "eevee",
+            "asr",
+            "data/tagged.transcriptions.csv",
+            "data/predicted.transcriptions.csv",
+            "--json",
+            "--min-k=1,5,10",
+        ],
+    )
+    main()
+
+    output = json.loads(capsys.readouterr().out)
+    assert {"Min 1 WER", "Min 5 WER", "Min WER"} <= set(output["Value"])
+
+
+def test_asr_report_dump_ops(labels):
+    true_df, pred_df = labels
+
+    _, breakdown, ops = asr_report(true_df, pred_df, dump=True)
+    expected = pd.DataFrame(
+        get_ops(breakdown["transcription"], breakdown["pred_transcription"])
+    ).sort_values(by=["operation", "count"], ascending=[True, False])
+
+    pd.testing.assert_frame_equal(ops, expected)
+
+    # Operations counted per chunk in workers are merged back in order
+    _, _, parallel_ops = asr_report(true_df, pred_df, dump=True, workers=2)
+    pd.testing.assert_frame_equal(parallel_ops, expected)
+
+
+def test_asr_report_ops_top_k(labels):
+    true_df, pred_df = labels
+
+    _, _, ops = asr_report(true_df, pred_df, dump=True)
+    _, _, top_ops = asr_report(true_df, pred_df, dump=True, ops_top_k=3)
+
+    assert len(top_ops) == 3
+    assert (top_ops["error"] == 0).all()
+    assert set(top_ops["count"]) <= set(ops["count"])
+
+    _, streamed_ops = asr_report_streaming(
+        "data/tagged.transcriptions.csv",
+        "data/predicted.transcriptions.csv",
+        chunksize=2,
+        ops_top_k=3,
+    )
+    pd.testing.assert_frame_equal(streamed_ops, top_ops)
+
+
+def test_asr_report_slices(labels):
+    true_df, pred_df = labels
+    true_df["short"] = true_df["transcription"].fillna("").str.split().str.len() < 3
+
+    reports = asr_report_slices(true_df, pred_df, "short", dump=True)
+    assert list(reports) == [False, True]
+
+    for value, (report, breakdown, ops) in reports.items():
+        subset = true_df[true_df["short"] == value][["id", "transcription"]]
+        expected, expected_breakdown, expected_ops = asr_report(
+            subset, pred_df, dump=True
+        )
+
+        pd.testing.assert_frame_equal(report, expected)
+        pd.testing.assert_frame_equal(breakdown, expected_breakdown)
+        pd.testing.assert_frame_equal(
+            ops.reset_index(drop=True), expected_ops.reset_index(drop=True)
+        )
+
+
+def test_cli_asr_ops_top_k_needs_dump(monkeypatch):
+    monkeypatch.setattr(
+        sys,
+        "argv",
+        [
+            "eevee",
+            "asr",
+            "data/tagged.transcriptions.csv",
+            "data/predicted.transcriptions.csv",
+            "--ops-top-k=5",
+        ],
+    )
+
+    with pytest.raises(ValueError):
+        main()
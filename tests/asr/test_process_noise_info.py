@@ -1,4 +1,5 @@
-from eevee.metrics.asr import extract_info_tags, remove_info_tags, check_if_tags_is_noisy
+import pandas as pd
+from eevee.metrics.asr import extract_info_tags, remove_info_tags, check_if_tags_is_noisy, process_noise_info
 
 
 def test_process_noise_info():
@@ -14,3 +15,17 @@ def test_process_noise_info():
 		assert extract_info_tags(transcription) == tags
 		assert remove_info_tags(transcription) == clean_transcription
 		assert check_if_tags_is_noisy(tags) == label
+
+
+def test_process_noise_info_subsets():
+
+	transcriptions = ["yes <inaudible>", "no <audio_silent>", " book a ticket. ", None, "music> stop"]
+	true_df = pd.DataFrame({"id": range(5), "transcription": transcriptions})
+	pred_df = pd.DataFrame({"id": range(5), "utterances": ["[]"] * 5})
+
+	noisy, not_noisy = process_noise_info(true_df, pred_df)
+
+	assert noisy["true"]["id"].tolist() == [0, 4]
+	assert not_noisy["true"]["id"].tolist() == [1, 2, 3]
+	assert noisy["true"]["transcription"].tolist() == ["yes ", " stop"]
+	assert not_noisy["true"]["transcription"].tolist() == ["no ", "book a ticket.", ""]
@@ -0,0 +1,62 @@
+import types
+
+import eevee.transforms as tr
+import pytest
+
+
+class FakeDocument:
+    def __init__(self, sentences, text=None):
+        self.text = text
+        self.sentences = sentences
+
+
+class FakePipeline:
+    """
+    Stand in for a stanza pipeline that lemmatizes words by dropping a
+    trailing "s", recording the texts of every call.
+    """
+
+    def __init__(self, lang, processors, **kwargs):
+        self.lang = lang
+        self.processors = processors
+        self.calls = []
+        FAKE_PIPELINES.append(self)
+
+    def _lemmatize(self, text):
+        words = [
+            types.SimpleNamespace(lemma=word[:-1] if word.endswith("s") else word)
+            for word in text.split()
+        ]
+        return FakeDocument([types.SimpleNamespace(words=words)], text=text)
+
+    def __call__(self, docs):
+        if isinstance(docs, str):
+            self.calls.append(docs)
+            return self._lemmatize(docs)
+
+        self.calls.append([doc.text for doc in docs])
+        return [self._lemmatize(doc.text) for doc in docs]
+
+
+FAKE_PIPELINES = []
+
+
+@pytest.fixture
+def fake_stanza(monkeypatch):
+    """
+    Replace stanza with `FakePipeline`s, starting from empty pipeline and
+    lemmatizer registries. Gives the list of pipelines built.
+    """
+    FAKE_PIPELINES.clear()
+    monkeypatch.setattr(
+        tr,
+        "stanza",
+        types.SimpleNamespace(
+            Pipeline=FakePipeline, Document=FakeDocument, download=lambda lang: None
+        ),
+        raising=False,
+    )
+    monkeypatch.setattr(tr, "_STANZA_PIPELINES", {})
+    monkeypatch.setattr(tr, "_LEMMATIZERS", {})
+
+    return FAKE_PIPELINES
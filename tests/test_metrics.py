@@ -1,15 +1,20 @@
+from collections import Counter
+
 import numpy as np
 import pandas as pd
 import pytest
 from eevee.metrics import (
     aggregate_metrics,
+    aggregate_top_n,
     intent_report,
+    metric_arrays,
     slot_capture_rate,
     slot_fnr,
     slot_fpr,
     slot_retry_rate,
     wer,
 )
+from eevee.metrics.utils import SpaceSaving
 
 
 @pytest.mark.parametrize(
@@ -84,6 +89,27 @@ def test_aggregate_metrics_min(ams, output):
     assert aggregate_metrics(ams, min) == output
 
 
+def test_aggregate_top_n():
+    ams = [
+        {"hyp": "a", "base": {"wer": 1, "hits": 2}, "lem": {"wer": 0}},
+        {"hyp": "b", "base": {"wer": 0, "hits": 3}, "lem": {"wer": 2}},
+        {"hyp": "c", "base": {"wer": 2, "hits": 1}, "lem": {"wer": 4}},
+    ]
+    arrays = metric_arrays(ams)
+
+    assert arrays["base"][0] == ["wer", "hits"]
+    assert arrays["base"][1].shape == (3, 2)
+    assert aggregate_metrics(arrays) == aggregate_metrics(ams)
+    assert aggregate_metrics(arrays, min) == aggregate_metrics(ams, min)
+
+    top = aggregate_top_n(arrays, [1, 2, 5])
+    for n in [1, 2, 5]:
+        assert top[n] == aggregate_metrics(ams[:n])
+
+    with pytest.raises(ValueError):
+        aggregate_top_n(ams, [0])
+
+
 @pytest.mark.parametrize(
     "y_true, y_pred, fpr",
     [
@@ -131,3 +157,27 @@ def test_intents(y_true, y_pred, macro_f1):
 )
 def test_wer(ref, hyp, result):
     assert wer(ref, hyp) == result
+
+
+def test_space_saving():
+    stream = ["a"] * 50 + ["b"] * 30 + list("cdefghij") * 2 + ["a"] * 10
+    summary = SpaceSaving(capacity=4)
+    for item in stream:
+        summary.add(item)
+
+    true_counts = Counter(stream)
+    assert len(summary) == 4
+    assert summary.total == len(stream)
+    for item, count, error in summary.top():
+        assert count - error <= true_counts[item] <= count
+    assert [item for item, _, _ in summary.top(2)] == ["a", "b"]
+
+    halves = SpaceSaving(capacity=4), SpaceSaving(capacity=4)
+    for idx, item in enumerate(stream):
+        halves[idx % 2].add(item)
+    merged = halves[0].merge(halves[1])
+
+    assert merged.total == len(stream)
+    for item, count, error in merged.top():
+        assert count - error <= true_counts[item] <= count
+    assert [item for item, _, _ in merged.top(2)] == ["a", "b"]
@@ -0,0 +1,125 @@
+import gc
+import weakref
+
+import pandas as pd
+import pytest
+import eevee.transforms as tr
+
+
+SENTENCES = [
+    "",
+    "  I won't  GO ",
+    "we're <noise> here, can't you [laugh] see",
+    "let's   book\ta ticket",
+]
+
+TRANSFORM = tr.Compose(
+    [
+        tr.ToLowerCase(),
+        tr.ExpandCommonEnglishContractions(),
+        tr.RemoveKaldiNonWords(),
+        tr.RemovePunctuation(),
+        tr.SubstituteWords({"ticket": "tkt", "book": "reserve"}),
+        tr.RemoveWhiteSpace(replace_by_space=True),
+        tr.RemoveMultipleSpaces(),
+        tr.Strip(),
+        tr.SentencesToListOfWords(),
+        tr.RemoveEmptyStrings(),
+    ]
+)
+
+
+@pytest.mark.parametrize("sentence", SENTENCES)
+def test_compiled_transform(sentence):
+    assert TRANSFORM.compile()(sentence) == TRANSFORM(sentence)
+
+
+def test_series_transform():
+    expected = [TRANSFORM(s) for s in SENTENCES]
+
+    assert TRANSFORM(pd.Series(SENTENCES)).tolist() == expected
+    assert TRANSFORM.compile()(pd.Series(SENTENCES)).tolist() == expected
+
+
+def test_lemma_cache_lru():
+    cache = tr.LemmaCache(max_size=2)
+    cache.put("a", "lemma a")
+    cache.put("b", "lemma b")
+
+    assert cache.get("a") == "lemma a"
+    cache.put("c", "lemma c")
+
+    # "b" was the least recently used
+    assert cache.get("b") is None
+    assert cache.get("a") == "lemma a"
+    assert cache.get("c") == "lemma c"
+    assert cache.stats() == {"hits": 3, "misses": 1, "hit_rate": 0.75, "size": 2}
+
+
+def test_lemma_cache_keys():
+    keys = {
+        tr.LemmaCache.key("en", "tokenize, lemma", "books"),
+        tr.LemmaCache.key("hi", "tokenize, lemma", "books"),
+        tr.LemmaCache.key("en", "tokenize, mwt, lemma", "books"),
+        tr.LemmaCache.key("en", "tokenize, lemma", "book"),
+    }
+    assert len(keys) == 4
+    assert tr.LemmaCache.key("en", "tokenize, lemma", "books") in keys
+
+
+def test_lemma_cache_sqlite(tmp_path):
+    path = str(tmp_path / "lemmas.sqlite")
+
+    cache = tr.LemmaCache(path, max_size=1, commit_size=3)
+    cache.put("a", "lemma a")
+    cache.put("b", "lemma b")
+
+    # Pending entries are found even when evicted from memory, and written
+    # together once there are `commit_size` of them
+    assert cache.get("a") == "lemma a"
+    assert tr.LemmaCache(path).get("a") is None
+
+    cache.put("c", "lemma c")
+    assert tr.LemmaCache(path).get("a") == "lemma a"
+
+    cache.put("d", "lemma d")
+    cache.close()
+
+    reopened = tr.LemmaCache(path)
+    assert [reopened.get(key) for key in "abcd"] == [f"lemma {key}" for key in "abcd"]
+    assert reopened.get("e") is None
+    assert (reopened.hits, reopened.misses) == (4, 1)
+    reopened.close()
+
+    # Closed caches aren't kept alive for the exit handler
+    ref = weakref.ref(reopened)
+    del reopened
+    gc.collect()
+    assert ref() is None
+
+
+def test_get_stanza_pipeline(fake_stanza):
+    nlp = tr.get_stanza_pipeline("en")
+
+    assert tr.get_stanza_pipeline("en") is nlp
+    assert tr.get_stanza_pipeline("en", "tokenize, lemma") is nlp
+    assert tr.get_stanza_pipeline("hi") is not nlp
+    assert tr.get_stanza_pipeline("en", "tokenize, mwt, lemma") is not nlp
+    assert len(fake_stanza) == 3
+
+    assert tr.get_lemmatizer("en") is tr.get_lemmatizer("en")
+    assert tr.get_lemmatizer("en").nlp is nlp
+    assert len(fake_stanza) == 3
+
+
+def test_lemmatize_process_batch(fake_stanza):
+    lemmatizer = tr.Lemmatize("en")
+    assert lemmatizer("books") == "book"
+
+    given = lemmatizer.process_batch(["books", "two tickets", "books", "cats", "two tickets"])
+    assert given == ["book", "two ticket", "book", "cat", "two ticket"]
+
+    # Only the misses go to stanza, once each and in a single call
+    assert fake_stanza[0].calls == ["books", ["two tickets", "cats"]]
+    assert lemmatizer.process_batch(["cats", "books"]) == ["cat", "book"]
+    assert len(fake_stanza[0].calls) == 2